@@ -15,13 +15,14 @@ def run_app():
     if has_error:
         return
 
-    # Can either pass nothing or pass True/False to use_memory for more conservative stops
-    stops = IntelliStop(use_memory=True)
+    # Can either pass nothing or pass True/False to use_memory for more conservative stops. Price
+    # history is cached on disk, so later runs only download the latest bars
+    stops = IntelliStop({"use_cache": True}, use_memory=True)
 
     print(f"Starting 'Intellistop' with fund ticker(s): '{fund_raw}'...")
 
-    for fund in fund_list:
-        vf_data, has_error = stops.run_analysis_for_ticker(fund)
+    # All funds are downloaded in a single request, then analyzed one at a time
+    for fund, vf_data, has_error in stops.run_analysis_for_ticker_batch(fund_list):
         if has_error:
             print(f"\r\nFund ticker '{fund}' failed to generate Intellistops data.")
             _ = input("Press any key to continue...")
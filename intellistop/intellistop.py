@@ -1,36 +1,56 @@
 """ intellistop.py """
-from typing import Union, Tuple, List
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Union, Tuple, List, Callable, Iterator
 
 import numpy as np
 
 from .libs import (
-    download_data, ConfigProperties, VFStopsResultType, get_fourier_spectrum,
-    calculate_time_series_variances, simple_moving_average_filter, intelligent_moving_average,
-    IntelligentMovingAvgType, get_slope_of_data_set, generate_stop_loss_data_set, VFTimeSeriesType,
-    CurrentStatusType, get_current_stop_loss_values, Storage, NewTickerDataStorageType,
-    StorageKeysEnum
+    ConfigProperties, VFStopsResultType, get_fourier_spectrum, PriceDataProvider, get_data_provider,
+    rolling_variances, NON_DERIVED_WINDOW, simple_moving_average_filter,
+    simple_moving_average_array, intelligent_moving_average, intelligent_moving_average_bank,
+    IntelligentMovingAvgType, get_slope_of_data_set, generate_stop_loss_data_set,
+    VFTimeSeriesType, CurrentStatusType, get_current_stop_loss_values, Storage,
+    NewTickerDataStorageType, StorageKeysEnum
 )
 
 class IntelliStop:
     """ Intellistop class and functioning object """
-    config: ConfigProperties = {}
-    data = {}
-    fund_name = ""
+    # pylint: disable=too-many-instance-attributes
     benchmark = "^GSPC"
-    latest_results = None
-    stops = VFStopsResultType()
-    intelligent_moving_avg = IntelligentMovingAvgType()
-    has_errors = False
-    use_memory = False
-    storage_provider: Union[Storage, None] = None
-
-    def __init__(self, config: Union[dict, None] = None, use_memory: Union[dict, None] = None):
-        if use_memory:
-            self.use_memory = True
-            self.storage_provider = Storage()
+    # Analysis state is per instance (and the results per run), so instances can run in threads
+    config: ConfigProperties
+    config_settings: dict
+    data: dict
+    fund_name: str
+    latest_results: None
+    stops: VFStopsResultType
+    intelligent_moving_avg: IntelligentMovingAvgType
+    has_errors: bool
+    use_memory: bool
+    storage_provider: Union[Storage, None]
+    fetch_function: Union[Callable, None]
+    data_provider: PriceDataProvider
+
+    def __init__(self,
+                 config: Union[dict, None] = None,
+                 use_memory: Union[dict, None] = None,
+                 fetch_function: Union[Callable, None] = None):
+        # fetch_function: optional stand-in for yf.download (e.g. a local data source for tests)
+        self.fetch_function = fetch_function
+        self.data = {}
+        self.fund_name = ""
+        self.latest_results = None
+        self.stops = VFStopsResultType()
+        self.intelligent_moving_avg = IntelligentMovingAvgType()
+        self.has_errors = False
+        self.use_memory = bool(use_memory)
+        self.storage_provider = Storage() if use_memory else None
         if not config:
             config = {}
+        self.config_settings = config
         self.config = ConfigProperties(config)
+        self.data_provider = get_data_provider(self.config, fetch_function=self.fetch_function)
 
 
     def update_config(self, config: Union[dict, None] = None):
@@ -43,7 +63,9 @@ class IntelliStop:
         """
         if not config:
             config = {}
+        self.config_settings = config
         self.config = ConfigProperties(config)
+        self.data_provider = get_data_provider(self.config, fetch_function=self.fetch_function)
 
 
     def get_correct_pricing_key(self, data_set: dict) -> str:
@@ -72,13 +94,16 @@ class IntelliStop:
         return 'Close'
 
 
-    def fetch_extended_time_series(self, fund: str) -> dict:
+    def fetch_extended_time_series(self, fund: str, fund_data: Union[dict, None] = None) -> dict:
         """fetch_extended_time_series
 
-        Pull data using yf api. For now, we'll default to a period of '5y' for analysis
+        Pull data from the config's data provider (yf api by default), over the config's period
+        (default of '5y') or dates
 
         Args:
             fund (str): ticker symbol of the trade
+            fund_data (Union[dict, None], optional): already downloaded data of the fund (e.g.
+                from fetch_extended_time_series_batch), skipping the download. Defaults to None.
 
         Returns:
             dict: data dict of 'OCHLVD' data, where 'D' is date. Format is nested:
@@ -90,10 +115,10 @@ class IntelliStop:
                 }
         """
         self.fund_name = fund
-        self.config.yf_properties.period = '5y'
-        self.config.yf_properties.start_date = None
-        self.config.yf_properties.end_date = None
-        self.data = download_data(fund, self.config)
+        if fund_data is not None:
+            self.data = fund_data
+        else:
+            self.data = self.data_provider.get_data([fund], self.config)
 
         if len(self.data[self.fund_name]['Close']) == 0:
             self.has_errors = True
@@ -102,25 +127,44 @@ class IntelliStop:
         return self.data
 
 
-    def return_data(self, fund="", key: Union[str, None] = None) -> Union[dict, list]:
+    def fetch_extended_time_series_batch(self, funds: List[str]) -> dict:
+        """fetch_extended_time_series_batch
+
+        Pull data of several funds at once (a single request for the yf api), over the same
+        period or dates as fetch_extended_time_series
+
+        Args:
+            funds (List[str]): ticker symbols of the trades
+
+        Returns:
+            dict: data dict of 'OCHLVD' data per fund, in the format of fetch_extended_time_series
+        """
+        return self.data_provider.get_data(funds, self.config)
+
+
+    def return_data(self,
+                    fund="",
+                    key: Union[str, None] = None) -> Union[dict, np.ndarray, List[str]]:
         """return_data
 
-        Returns the full ticker data as a dict or a list, if supplied the ticker data object key.
+        Returns the full ticker data as a dict, or a numpy array, if supplied the ticker data
+        object key ('Date' is a list of date strings).
 
         | Fund | key | Returned Data |
         ------------------------------
-        | "" | x | All data (list of all funds data) |
-        | Y | None | Fund data of 'Close' |
-        | Y | [Close, Open, High, Low] | Fund data of supplied key |
+        | "" | x | All data (dict of all funds data) |
+        | Y | None | Fund data of 'Close' (np.ndarray) |
+        | Y | [Close, Open, High, Low] | Fund data of supplied key (np.ndarray) |
+        | Y | 'Date' | Fund dates (list of date strings) |
         | Y | '__full__' | all of single fund data |
 
         Args:
             fund (str, optional): ticker string. Defaults to "".
-            key (Union[str, None], optional): ticker dict object key, will return a list. Defaults
-                to None.
+            key (Union[str, None], optional): ticker dict object key, will return an array.
+                Defaults to None.
 
         Returns:
-            Union[dict, list]: ticker dict object or list
+            Union[dict, np.ndarray, List[str]]: ticker dict object, array, or date strings
         """
         if key and key == '__full__' and fund != "":
             return self.data[fund]
@@ -144,42 +188,32 @@ class IntelliStop:
             return self.stops
 
         data_key = self.config.vf_properties.pricing
-        current_max = max(self.data[self.fund_name][data_key])
+        price_data = np.asarray(self.data[self.fund_name][data_key], dtype=float)
+        current_max = np.max(price_data)
         self.stops.current_status.max_price = current_max
-        self.stops.current_status.max_price_date = \
-            self.data[self.fund_name][data_key].index(current_max)
+        self.stops.current_status.max_price_date = int(np.argmax(price_data))
         self.stops.fund_name = self.fund_name
 
-        sma = simple_moving_average_filter(self.data[self.fund_name][data_key], filter_size=200)
-        lp_dataset = [datum - sma[i] for i, datum in enumerate(self.data[self.fund_name][data_key])]
+        sma = simple_moving_average_array(price_data, filter_size=200)
+        lp_dataset = price_data - sma
         _, _, top_10 = get_fourier_spectrum({data_key: lp_dataset}, key=data_key)
 
-        for is_derived in [False, True]:
-            variances, _ = calculate_time_series_variances(
-                lp_dataset,
-                overrides={
-                    'window': int(min(top_10)),
-                    'mode': 'std',
-                    'use_derived': is_derived
-                }
-            )
+        # Both the alternate (fixed window) and derived (spectrum-based window) variants share
+        # the same running sums of the detrended data set
+        alternate_std, derived_std = np.sqrt(
+            rolling_variances(lp_dataset, [NON_DERIVED_WINDOW, int(min(top_10))]))
 
-            truthy_vars = []
-            falsy_vars = []
-            for i, datum in enumerate(self.data[self.fund_name][data_key]):
-                if datum > sma[i]:
-                    truthy_vars.append(variances[i])
-                if datum < sma[i]:
-                    falsy_vars.append(variances[i])
+        above_sma = price_data > sma
+        below_sma = price_data < sma
+        price_average = np.average(price_data)
 
-            truthy_mean = np.mean(truthy_vars)
-            falsy_mean = np.mean(falsy_vars)
+        for is_derived, variances in [(False, alternate_std), (True, derived_std)]:
+            truthy_mean = np.mean(variances[above_sma])
+            falsy_mean = np.mean(variances[below_sma])
 
             root_sq_mean = np.sqrt((truthy_mean ** 2) + (falsy_mean ** 2))
-            root_sq_fraction = (3.0 * root_sq_mean) \
-                / np.average(self.data[self.fund_name][data_key]) * 100.0
-            root_sq_sl = max(self.data[self.fund_name][data_key]) \
-                * (1.0 - (root_sq_fraction / 100.0))
+            root_sq_fraction = (3.0 * root_sq_mean) / price_average * 100.0
+            root_sq_sl = current_max * (1.0 - (root_sq_fraction / 100.0))
 
             if is_derived:
                 self.stops.derived.vf = root_sq_fraction
@@ -208,8 +242,7 @@ class IntelliStop:
 
         if self.stops.vf.average > 50.0:
             self.stops.vf.curated = 50.0
-            self.stops.stop_loss.curated = max(self.data[self.fund_name][data_key]) \
-                * (1.0 - (self.stops.vf.curated / 100.0))
+            self.stops.stop_loss.curated = current_max * (1.0 - (self.stops.vf.curated / 100.0))
 
         return self.stops
 
@@ -250,6 +283,25 @@ class IntelliStop:
         )
 
 
+    def generate_intelligent_moving_average_bank(self, windows: List[int]) -> np.ndarray:
+        """generate_intelligent_moving_average_bank
+
+        Generate the IMA of the current fund for a whole set of candidate window sizes in one pass
+        (e.g. for window-sensitivity studies around the VF-derived window).
+
+        Args:
+            windows (List[int]): IMA window sizes
+
+        Returns:
+            np.ndarray: IMAs of shape (len(windows), len(price data)); row order matches windows
+        """
+        if self.has_errors:
+            return np.empty((len(windows), 0))
+
+        data_key = self.config.vf_properties.pricing
+        return intelligent_moving_average_bank(self.data[self.fund_name][data_key], windows)
+
+
     def analyze_data_set(self) -> List[VFTimeSeriesType]:
         """analyze_data_set
 
@@ -307,13 +359,21 @@ class IntelliStop:
     # ACTUAL FUNCTION
     ##########################################################################################
 
-    def run_analysis_for_ticker(self, fund: str) -> Tuple[VFStopsResultType, bool]:
+    def run_analysis_for_ticker(self,
+                                fund: str,
+                                fund_data: Union[dict, None] = None,
+                                update_storage: bool = True
+                                ) -> Tuple[VFStopsResultType, bool]:
         """run_analysis_for_ticker
 
         High-level function that runs all Intellistop functionality, a single function to run
 
         Args:
             fund (str): ticker symbol (e.g. "SPY")
+            fund_data (Union[dict, None], optional): already downloaded data of the fund, see
+                fetch_extended_time_series. Defaults to None.
+            update_storage (bool, optional): with use_memory, store the results right away.
+                Defaults to True.
 
         Returns:
             VFStopsResultType: The full results of the function:
@@ -329,9 +389,11 @@ class IntelliStop:
 
             boolean: has_error (True if error in calculation)
         """
-        # We need to remember to reset on looping
+        # We need to remember to reset on looping; each run gets its own result objects
         self.has_errors = False
-        self.fetch_extended_time_series(fund)
+        self.stops = VFStopsResultType()
+        self.intelligent_moving_avg = IntelligentMovingAvgType()
+        self.fetch_extended_time_series(fund, fund_data=fund_data)
         if self.has_errors:
             return self.stops, True
 
@@ -339,12 +401,168 @@ class IntelliStop:
         self.generate_intelligent_moving_average()
         self.analyze_data_set()
 
-        if self.use_memory:
-            data = NewTickerDataStorageType(
-                self.stops.vf.curated,
-                self.stops.stop_loss.curated,
-                self.stops.data_sets[-1].max_price)
-            self.storage_provider.update_ticker(self.stops.fund_name, data)
+        if self.use_memory and update_storage:
+            self.storage_provider.update_ticker(self.stops.fund_name, self.get_storage_update())
             self.storage_provider.store()
 
         return self.stops, False
+
+
+    def get_storage_update(self) -> NewTickerDataStorageType:
+        """get_storage_update
+
+        Returns:
+            NewTickerDataStorageType: the latest results, as stored for use_memory
+        """
+        return NewTickerDataStorageType(
+            self.stops.vf.curated,
+            self.stops.stop_loss.curated,
+            self.stops.data_sets[-1].max_price)
+
+
+    def run_analysis_for_ticker_batch(
+            self, funds: List[str]) -> Iterator[Tuple[str, VFStopsResultType, bool]]:
+        """run_analysis_for_ticker_batch
+
+        Multi-fund version of run_analysis_for_ticker: data of all funds is pulled in a single yf
+        api request, then each fund is analyzed in turn. Results are yielded one fund at a time,
+        while the fund's data is still the current data (e.g. for return_data).
+
+        Args:
+            funds (List[str]): ticker symbols (e.g. ["SPY", "VTSAX"])
+
+        Yields:
+            Iterator[Tuple[str, VFStopsResultType, bool]]: fund, its results, and has_error
+        """
+        batch_data = self.fetch_extended_time_series_batch(funds)
+        for fund in funds:
+            fund_data = {
+                ticker: data for ticker, data in batch_data.items()
+                if ticker in (fund, self.benchmark)
+            }
+            vf_data, has_error = self.run_analysis_for_ticker(fund, fund_data=fund_data)
+            yield fund, vf_data, has_error
+
+
+    def run_analysis_for_tickers(
+            self,
+            funds: List[str],
+            workers: Union[int, None] = None,
+            use_threads: bool = False) -> Iterator[Tuple[str, VFStopsResultType, bool]]:
+        """run_analysis_for_tickers
+
+        Multi-fund version of run_analysis_for_ticker over a pool of worker processes (or threads).
+        Results are yielded as the funds complete (not in the order of funds); closing the generator
+        early cancels the funds not started yet. Remote data (yf api) is pulled once, in a single
+        request, and handed to the workers; local data providers are read by the workers
+        themselves. With use_memory, storage is updated once, at the end.
+
+        Args:
+            funds (List[str]): ticker symbols (e.g. ["SPY", "VTSAX"])
+            workers (Union[int, None], optional): number of worker processes (or threads).
+                Defaults to None (the executor's default).
+            use_threads (bool, optional): run the funds in threads of this process, each with its
+                own IntelliStop, rather than in worker processes. Defaults to False.
+
+        Yields:
+            Iterator[Tuple[str, VFStopsResultType, bool]]: fund, its results, and has_error
+        """
+        # pylint: disable=too-many-locals
+        worker_settings = dict(self.config_settings)
+        batch_data = {}
+        if self.data_provider.is_remote:
+            batch_data = self.fetch_extended_time_series_batch(funds)
+            # Workers get the data, so they don't need the (possibly not picklable) provider
+            worker_settings.pop("data_provider", None)
+            worker_settings.pop("data_provider_args", None)
+
+        if use_threads:
+            thread_state = threading.local()
+
+            def run_analysis_in_thread(fund: str, fund_data: Union[dict, None]):
+                if not hasattr(thread_state, "intellistop"):
+                    thread_state.intellistop = self._get_thread_worker()
+                return _analyze_fund(thread_state.intellistop, fund, fund_data)
+
+            executor = ThreadPoolExecutor(max_workers=workers)
+            task = run_analysis_in_thread
+        else:
+            executor = ProcessPoolExecutor(max_workers=workers,
+                                           initializer=_init_analysis_worker,
+                                           initargs=(worker_settings, self.use_memory))
+            task = _run_analysis_worker
+
+        storage_updates = {}
+        futures = []
+        try:
+            for fund in dict.fromkeys(funds):
+                fund_data = {
+                    ticker: data for ticker, data in batch_data.items()
+                    if ticker in (fund, self.benchmark)
+                } if self.data_provider.is_remote else None
+                futures.append(executor.submit(task, fund, fund_data))
+
+            for future in as_completed(futures):
+                fund, vf_data, has_error, storage_update = future.result()
+                if storage_update is not None:
+                    storage_updates[fund] = storage_update
+                yield fund, vf_data, has_error
+
+        finally:
+            # Closed early (break, exception): funds not yet started are dropped, not analyzed.
+            # (Cancelled one by one, as shutdown's cancel_futures needs python 3.9.)
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+            if self.use_memory and storage_updates:
+                for fund, storage_update in storage_updates.items():
+                    self.storage_provider.update_ticker(fund, storage_update)
+                self.storage_provider.store()
+
+
+    def _get_thread_worker(self) -> 'IntelliStop':
+        """ IntelliStop for a worker thread: same config, data provider, and (read-only) storage """
+        worker = IntelliStop(self.config_settings, fetch_function=self.fetch_function)
+        worker.data_provider = self.data_provider
+        worker.use_memory = self.use_memory
+        worker.storage_provider = self.storage_provider
+        return worker
+
+
+##########################################################################################
+# POOL WORKERS (see IntelliStop.run_analysis_for_tickers)
+##########################################################################################
+
+# Each worker process builds its IntelliStop once and reuses it for all of its funds
+_WORKER_INTELLISTOP: Union[IntelliStop, None] = None
+
+
+def _init_analysis_worker(config: dict, use_memory: bool):
+    """ Process pool initializer: IntelliStop of the worker process """
+    # pylint: disable=global-statement
+    global _WORKER_INTELLISTOP
+    _WORKER_INTELLISTOP = IntelliStop(config, use_memory=use_memory)
+
+
+def _analyze_fund(
+        stops: IntelliStop, fund: str, fund_data: Union[dict, None]
+) -> Tuple[str, VFStopsResultType, bool, Union[NewTickerDataStorageType, None]]:
+    """ Analysis of a single fund by a worker. A failing fund comes back with has_error, rather
+    than failing the whole pool. Storage updates go back to the caller. """
+    # pylint: disable=broad-exception-caught
+    try:
+        vf_data, has_error = stops.run_analysis_for_ticker(
+            fund, fund_data=fund_data, update_storage=False)
+    except Exception:
+        return fund, VFStopsResultType(), True, None
+
+    storage_update = stops.get_storage_update() if stops.use_memory and not has_error else None
+    return fund, vf_data, has_error, storage_update
+
+
+def _run_analysis_worker(
+        fund: str, fund_data: Union[dict, None]
+) -> Tuple[str, VFStopsResultType, bool, Union[NewTickerDataStorageType, None]]:
+    """ Analysis of a single fund in a worker process """
+    return _analyze_fund(_WORKER_INTELLISTOP, fund, fund_data)
@@ -1,17 +1,36 @@
 """ __init__.py """
-from .api import download_data
+from .api import download_data, download_data_batch, download_cached_data
+from .async_api import download_data_async, download_data_concurrent, fetch_ticker_history
 from .constants import YF_DATA_CONFIG_DEFAULTS
 from .lib_types import (
     ConfigProperties, VFStopsResultType, IntelligentMovingAvgType, VFTimeSeriesType,
-    CurrentStatusType, NewTickerDataStorageType
+    CurrentStatusType, NewTickerDataStorageType, VFSweepResultType, VFLockStepResultType,
+    PriceCacheEntryType, TickerDataType
+)
+from .variances import (
+    calculate_time_series_variances, rolling_variance, rolling_variances, NON_DERIVED_WINDOW,
+    RollingStdAccumulator
 )
-from .variances import calculate_time_series_variances
 from .volatility_factor import (
-    get_stop_loss_from_value, generate_stop_loss_data_set, get_current_stop_loss_values
+    get_stop_loss_from_value, generate_stop_loss_data_set, get_current_stop_loss_values,
+    sweep_volatility_factors, simulate_stop_losses, StopLossState, get_stop_loss_state,
+    VolatilityFactorAccumulator
 )
 from .filters import (
-    simple_moving_average_filter, intelligent_moving_average, get_slope_of_data_set
+    simple_moving_average_filter, simple_moving_average_array, intelligent_moving_average,
+    intelligent_moving_average_array, intelligent_moving_average_bank, get_slope_of_data_set,
+    SimpleMovingAverageStream, ExponentialMovingAverageStream, WeightedMovingAverageStream,
+    IntelligentMovingAverageStream, SlopeStream
+)
+from .fourier import (
+    get_fourier_spectrum, get_fourier_spectrum_batch, get_top_periods_by_ticker
 )
-from .fourier import get_fourier_spectrum
-from .extrema import get_extrema
+from .extrema import get_extrema, get_extrema_by_thresholds, TREND_CODES
 from .storage import Storage, StorageKeysEnum
+from .providers import (
+    PriceDataProvider, YFinanceProvider, ConcurrentYFinanceProvider, DirectoryProvider,
+    PriceStoreProvider, InMemoryProvider, SyntheticProvider, DATA_PROVIDERS, get_data_provider,
+    select_window
+)
+from .price_store import PriceStore, write_price_store
+from .price_cache import load_price_cache, store_price_cache, get_price_cache_path
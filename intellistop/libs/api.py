@@ -2,13 +2,46 @@
 
 Utilizes yfinance and organizes data in a more addressable way
 """
+import datetime
+from typing import Union, List, Callable
+
+import numpy as np
 import pandas as pd
 import yfinance as yf
 
-from .lib_types import ConfigProperties
+from .lib_types import ConfigProperties, PriceCacheEntryType, TickerDataType
+from .price_cache import (
+    is_cacheable_interval, get_period_start_date, load_price_cache, store_price_cache,
+    merge_ticker_data, trim_ticker_data, is_overlap_consistent, is_cache_stale,
+    UPDATE_TIME_FORMAT
+)
+
+
+def get_download_args(tickers: str, config: ConfigProperties) -> dict:
+    """ Keyword arguments of yf.download (or a stand-in fetch function) for the config """
+    download_args = {
+        "tickers": tickers,
+        "interval": config.yf_properties.interval,
+        "group_by": 'ticker'
+    }
+    if config.yf_properties.start_date:
+        download_args["start"] = config.yf_properties.start_date
+        if config.yf_properties.end_date:
+            download_args["end"] = config.yf_properties.end_date
+    else:
+        download_args["period"] = config.yf_properties.period
+    return download_args
+
 
+def _is_using_cache(config: ConfigProperties) -> bool:
+    """ Period-based downloads of daily (or longer) bars go through the price cache, if enabled """
+    return config.yf_properties.use_cache and not config.yf_properties.start_date and \
+        not config.yf_properties.end_date and is_cacheable_interval(config.yf_properties.interval)
 
-def download_data(fund: str, config: ConfigProperties) -> dict:
+
+def download_data(fund: str,
+                  config: ConfigProperties,
+                  fetch_function: Union[Callable, None] = None) -> dict:
     """download_data
 
     Function that does the actual data pull from yfinance for ticker info
@@ -16,39 +49,152 @@ def download_data(fund: str, config: ConfigProperties) -> dict:
     Args:
         fund (str): ticker string (e.g. "VTSAX", "AAPL", etc.)
         config (ConfigProperties): period and date properties for fund, though default is best
+        fetch_function (Union[Callable, None], optional): stand-in for yf.download (same keyword
+            arguments and DataFrame format). Defaults to None (yf.download).
 
     Returns:
         dict: formatted data in a dictionary: data['fund_name'] = {'Close': [], 'Date': [], ...}
     """
-    period = config.yf_properties.period
-    interval = config.yf_properties.interval
-    start_date = config.yf_properties.start_date
-    end_date = config.yf_properties.end_date
-
     if config.yf_properties.include_bench:
         fund += " ^GSPC"
 
-    if start_date and end_date:
-        data = yf.download(
-            tickers=fund,
-            start=start_date,
-            end=end_date,
-            interval=interval,
-            group_by='ticker'
-        )
-    elif start_date:
-        data = yf.download(tickers=fund, start=start_date, interval=interval, group_by='ticker')
-    else:
-        data = yf.download(tickers=fund, period=period, interval=interval, group_by='ticker')
+    if _is_using_cache(config):
+        return download_cached_data(fund, config, fetch_function=fetch_function)
+
+    fetch_function = fetch_function or yf.download
+    data = fetch_function(**get_download_args(fund, config))
 
     formatted_data = format_data(data, fund)
     return formatted_data
 
 
+def download_data_batch(funds: List[str],
+                        config: ConfigProperties,
+                        fetch_function: Union[Callable, None] = None) -> dict:
+    """download_data_batch
+
+    Multi-ticker version of download_data: all tickers are pulled in a single (threaded) request,
+    then split per ticker with format_data.
+
+    Args:
+        funds (List[str]): ticker strings (e.g. ["VTSAX", "AAPL"])
+        config (ConfigProperties): period and date properties for funds, though default is best
+        fetch_function (Union[Callable, None], optional): stand-in for yf.download (same keyword
+            arguments and DataFrame format). Defaults to None (yf.download).
+
+    Returns:
+        dict: formatted data in a dictionary: data['fund_name'] = {'Close': [], 'Date': [], ...}
+    """
+    tickers = list(dict.fromkeys(funds))
+    if config.yf_properties.include_bench and "^GSPC" not in tickers:
+        tickers.append("^GSPC")
+
+    if _is_using_cache(config):
+        return download_cached_data(" ".join(tickers), config, fetch_function=fetch_function)
+
+    return _fetch_batch(tickers, get_download_args(" ".join(tickers), config), fetch_function)
+
+
+def _fetch_batch(tickers: List[str],
+                 download_args: dict,
+                 fetch_function: Union[Callable, None] = None) -> dict:
+    """ Pull all tickers in one (threaded) request and split the frame per ticker """
+    fetch_function = fetch_function or yf.download
+    data = fetch_function(**download_args, threads=True)
+
+    formatted_data = format_data(data, tickers[0])
+    for ticker in tickers:
+        formatted_data.setdefault(ticker, TickerDataType({"Close": np.empty(0)}))
+    return formatted_data
+
+
+def download_cached_data(fund: str,
+                         config: ConfigProperties,
+                         fetch_function: Union[Callable, None] = None) -> dict:
+    """download_cached_data
+
+    Cached version of download_data (period-based downloads only). Each ticker's history is kept
+    in the on-disk price cache; a cached ticker only downloads the bars after its last cached date
+    (once its cache is stale, see is_cache_stale), and a ticker gets a full download if it isn't
+    cached yet, if its cache doesn't cover the requested period, or if its history has been
+    re-adjusted (split, dividend) since it was cached. Tickers that need the same download share a
+    single request.
+
+    Args:
+        fund (str): ticker string, or space-separated ticker strings (e.g. "AAPL ^GSPC")
+        config (ConfigProperties): period, interval, and cache properties
+        fetch_function (Union[Callable, None], optional): stand-in for yf.download (same keyword
+            arguments and DataFrame format). Defaults to None (yf.download).
+
+    Returns:
+        dict: formatted data in a dictionary: data['fund_name'] = {'Close': [], 'Date': [], ...}
+    """
+    # pylint: disable=too-many-locals
+    interval = config.yf_properties.interval
+    cache_dir = config.yf_properties.cache_dir
+    period_start = get_period_start_date(config.yf_properties.period) or ""
+    now = datetime.datetime.now()
+
+    # Group the tickers by the download they need: full (None) or from their last cached dates
+    entries = {}
+    downloads = {None: []}
+    for ticker in dict.fromkeys(fund.split()):
+        entries[ticker] = load_price_cache(ticker, interval, cache_dir)
+        entry = entries[ticker]
+        if entry is None or entry.covered_start > period_start or len(entry.data.dates) == 0:
+            entries[ticker] = PriceCacheEntryType(TickerDataType(), covered_start=period_start)
+            downloads[None].append(ticker)
+        elif is_cache_stale(entry, now):
+            # Start on the last completed bar (the last bar may have been cached still forming),
+            # which is checked against the cache before the new bars are merged
+            start_date = entry.data.dates[max(len(entry.data.dates) - 2, 0)]
+            downloads.setdefault(str(start_date), []).append(ticker)
+
+    full_downloads = downloads.pop(None)
+    for start_date, tickers in downloads.items():
+        download_args = get_download_args(" ".join(tickers), config)
+        del download_args["period"]
+        download_args["start"] = start_date
+        new_data = _fetch_batch(tickers, download_args, fetch_function)
+        for ticker in tickers:
+            if is_overlap_consistent(entries[ticker].data, new_data[ticker]):
+                entries[ticker].data = merge_ticker_data(entries[ticker].data, new_data[ticker])
+            else:
+                # History re-adjusted since it was cached (split, dividend): download it again
+                entries[ticker] = PriceCacheEntryType(TickerDataType(), covered_start=period_start)
+                full_downloads.append(ticker)
+
+    if full_downloads:
+        new_data = _fetch_batch(
+            full_downloads, get_download_args(" ".join(full_downloads), config), fetch_function)
+        for ticker in full_downloads:
+            entries[ticker].data = new_data[ticker]
+
+    formatted_data = {}
+    downloaded = full_downloads + [ticker for tickers in downloads.values() for ticker in tickers]
+    for ticker, entry in entries.items():
+        if ticker in downloaded and len(entry.data.dates) > 0:
+            entry.update_date = now.strftime(UPDATE_TIME_FORMAT)
+            store_price_cache(ticker, interval, entry, cache_dir)
+        formatted_data[ticker] = trim_ticker_data(entry.data, period_start)
+
+    return formatted_data
+
+
+def _get_dates(yf_data: pd.DataFrame) -> np.ndarray:
+    """ Dates of the frame's index as datetime64[D] (local dates, for tz-aware intraday data) """
+    index = yf_data.index
+    if getattr(index, "tz", None) is not None:
+        index = index.tz_localize(None)
+    return index.to_numpy(dtype='datetime64[D]')
+
+
 def format_data(yf_data: pd.DataFrame, fund_name: str) -> dict:
     """format_data
 
-    Takes downloaded data and formats it in the preferred format for this tool
+    Takes downloaded data and formats it in the preferred format for this tool. Columns are numpy
+    arrays (views of the frame's data where possible, rather than per-element copies) and dates
+    are datetime64[D], with 'Date' strings made on demand (see TickerDataType).
 
     Args:
         yf_data (pd.DataFrame): data downloaded from yfinance for a fund
@@ -58,32 +204,30 @@ def format_data(yf_data: pd.DataFrame, fund_name: str) -> dict:
         dict: formatted data: data['fund_name'] = {'Close': [], 'Date': [], ...}
     """
     corrected_data = {}
+    dates = _get_dates(yf_data)
 
-    if 'Close' in yf_data.columns:
+    if not isinstance(yf_data.columns, pd.MultiIndex):
         # Single fund that's not in the "multiIndex" format
-        corrected_data[fund_name] = {}
-        for col in yf_data.columns:
-            corrected_data[fund_name][col] = {}
-        corrected_data[fund_name]["Date"] = [date.strftime("%Y-%m-%d") for date in yf_data.index]
-        for column in corrected_data[fund_name]:
-            if column != "Date":
-                # pylint: disable=unnecessary-comprehension
-                corrected_data[fund_name][column] = [price for price in yf_data[column].values]
-
-    else:
-        for col in yf_data.columns:
-            if col[0] not in corrected_data:
-                corrected_data[col[0]] = {}
-            corrected_data[col[0]][col[1]] = {}
-
-        # pylint: disable=consider-using-dict-items
-        for fund_ticker in corrected_data:
-            corrected_data[fund_ticker]["Date"] = [
-                date.strftime("%Y-%m-%d") for date in yf_data[fund_ticker].index]
-            for column in corrected_data[fund_ticker]:
-                if column != "Date":
-                    # pylint: disable=unnecessary-comprehension
-                    corrected_data[fund_ticker][column] = [
-                        price for price in yf_data[fund_ticker][column].values]
+        corrected_data[fund_name] = TickerDataType(
+            {column: yf_data[column].to_numpy() for column in yf_data.columns}, dates)
+        return corrected_data
+
+    # One 2D array for the whole frame; each fund's columns are (strided) views of it
+    values = yf_data.to_numpy(dtype=float)
+    is_missing = np.isnan(values)
+    columns_by_ticker = {}
+    for position, (fund_ticker, column) in enumerate(yf_data.columns):
+        columns_by_ticker.setdefault(fund_ticker, {})[column] = position
+
+    for fund_ticker, positions in columns_by_ticker.items():
+        # A multi-fund frame spans the union of all funds' dates; drop the ones a fund doesn't have
+        has_data = ~np.all(is_missing[:, list(positions.values())], axis=1)
+        if has_data.all():
+            corrected_data[fund_ticker] = TickerDataType(
+                {column: values[:, position] for column, position in positions.items()}, dates)
+        else:
+            corrected_data[fund_ticker] = TickerDataType(
+                {column: values[has_data, position] for column, position in positions.items()},
+                dates[has_data])
 
     return corrected_data
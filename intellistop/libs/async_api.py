@@ -0,0 +1,167 @@
+""" async_api.py
+
+Concurrent (asyncio) version of the download layer: one request per ticker, with the blocking fetch
+run in a thread pool, bounded concurrency, rate limiting, and retries with backoff. A failing
+ticker is reported on its own instead of failing the whole run.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple, Union, Callable
+
+import yfinance as yf
+
+from .api import format_data, get_download_args
+from .lib_types import ConfigProperties, TickerDataType
+
+
+def fetch_ticker_history(tickers: str,
+                         interval: str = "1d",
+                         period: Union[str, None] = None,
+                         start: Union[str, None] = None,
+                         end: Union[str, None] = None,
+                         **_kwargs):
+    """fetch_ticker_history
+
+    Default fetch function of download_data_async: yf.download's arguments (for one ticker), with
+    the download done by Ticker.history. Unlike yf.download, which keeps its results and errors in
+    module globals (not safe to call from several threads at once) and swallows errors, each call
+    is independent and raises on a failed request.
+
+    Args:
+        tickers (str): ticker symbol (e.g. "SPY")
+        interval (str, optional): yfinance interval. Defaults to "1d".
+        period (Union[str, None], optional): yfinance period. Defaults to None.
+        start (Union[str, None], optional): start date. Defaults to None.
+        end (Union[str, None], optional): end date. Defaults to None.
+
+    Returns:
+        pd.DataFrame: history, in the columns of yf.download (incl. 'Adj Close')
+    """
+    history_args = {"period": period} if period else {"start": start, "end": end}
+    return yf.Ticker(tickers).history(
+        interval=interval, auto_adjust=False, actions=False, raise_errors=True, **history_args)
+
+
+class _RateLimiter:
+    """ Spaces the start of consecutive requests at least min_interval seconds apart """
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self.next_start = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        """ wait for the next available request slot """
+        if self.min_interval <= 0.0:
+            return
+        async with self.lock:
+            now = asyncio.get_running_loop().time()
+            if self.next_start > now:
+                await asyncio.sleep(self.next_start - now)
+            self.next_start = max(now, self.next_start) + self.min_interval
+
+
+async def _download_ticker(ticker: str,
+                           config: ConfigProperties,
+                           fetch_function: Callable,
+                           executor: ThreadPoolExecutor,
+                           semaphore: asyncio.Semaphore,
+                           rate_limiter: _RateLimiter,
+                           max_retries: int,
+                           backoff: float) -> Tuple[str, Union[TickerDataType, None], str]:
+    """ Download one ticker, retrying errors (and empty results) with exponential backoff. Returns
+    the ticker, its data (None on failure), and the error message ("" on success). """
+    # pylint: disable=too-many-arguments,broad-exception-caught
+    loop = asyncio.get_running_loop()
+    fetch = functools.partial(fetch_function, **get_download_args(ticker, config))
+    error = ""
+    for attempt in range(max_retries + 1):
+        if attempt > 0:
+            await asyncio.sleep(backoff * 2 ** (attempt - 1))
+        async with semaphore:
+            await rate_limiter.wait()
+            try:
+                data = await loop.run_in_executor(executor, fetch)
+            except Exception as exception:
+                error = f"{type(exception).__name__}: {exception}"
+                continue
+
+        # An empty frame is either an unknown (or delisted) ticker or a request that failed
+        # quietly, so it's retried like an error and only reported once the retries are used up
+        formatted_data = format_data(data, ticker).get(ticker) if len(data) > 0 else None
+        if formatted_data is None:
+            error = "no data"
+            continue
+        return ticker, formatted_data, ""
+    return ticker, None, error
+
+
+async def download_data_async(funds: List[str],
+                              config: ConfigProperties,
+                              fetch_function: Union[Callable, None] = None,
+                              max_concurrency: int = 8,
+                              max_retries: int = 3,
+                              backoff: float = 0.5,
+                              min_interval: float = 0.0) -> Tuple[dict, dict]:
+    """download_data_async
+
+    Download each fund with its own request, up to max_concurrency at a time
+
+    Args:
+        funds (List[str]): ticker symbols (e.g. ["SPY", "VTSAX"])
+        config (ConfigProperties): period and date properties for funds
+        fetch_function (Union[Callable, None], optional): stand-in for yf.download (same keyword
+            arguments and DataFrame format), called from several threads at once. Defaults to None
+            (fetch_ticker_history).
+        max_concurrency (int, optional): max requests in flight. Defaults to 8.
+        max_retries (int, optional): retries of a failed request. Defaults to 3.
+        backoff (float, optional): seconds before the first retry, doubled on each retry.
+            Defaults to 0.5.
+        min_interval (float, optional): min seconds between the starts of two requests (rate
+            limit). Defaults to 0.0.
+
+    Returns:
+        Tuple[dict, dict]: formatted data of the funds that downloaded, in the format of
+            download_data, and the error message of each fund that didn't
+    """
+    # pylint: disable=too-many-arguments
+    tickers = list(dict.fromkeys(funds))
+    if config.yf_properties.include_bench and "^GSPC" not in tickers:
+        tickers.append("^GSPC")
+
+    fetch_function = fetch_function or fetch_ticker_history
+    semaphore = asyncio.Semaphore(max_concurrency)
+    rate_limiter = _RateLimiter(min_interval)
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        results = await asyncio.gather(*[
+            _download_ticker(
+                ticker, config, fetch_function, executor, semaphore, rate_limiter, max_retries,
+                backoff
+            )
+            for ticker in tickers
+        ])
+
+    formatted_data = {ticker: data for ticker, data, _ in results if data is not None}
+    errors = {ticker: error for ticker, data, error in results if data is None}
+    return formatted_data, errors
+
+
+def download_data_concurrent(funds: List[str],
+                             config: ConfigProperties,
+                             **kwargs) -> Tuple[dict, dict]:
+    """download_data_concurrent
+
+    Blocking wrapper of download_data_async (for callers without a running event loop)
+
+    Args:
+        funds (List[str]): ticker symbols (e.g. ["SPY", "VTSAX"])
+        config (ConfigProperties): period and date properties for funds
+        kwargs: see download_data_async
+
+    Returns:
+        Tuple[dict, dict]: formatted data of the funds that downloaded, and the error message of
+            each fund that didn't
+    """
+    return asyncio.run(download_data_async(funds, config, **kwargs))
@@ -2,6 +2,8 @@
 from typing import List, Tuple
 from enum import Enum
 
+import numpy as np
+
 
 class TrendType(Enum):
     """ TrendType """
@@ -10,6 +12,13 @@ class TrendType(Enum):
     UP = 'up'
 
 
+# Integer trend codes of the array-based (multi-threshold) extrema
+TREND_CODES = {TrendType.NEUTRAL: 0, TrendType.DOWN: -1, TrendType.UP: 1}
+
+# Bars scanned one at a time before switching to vectorized (doubling) chunks
+EXTREMA_SCAN_SIZE = 16
+
+
 def get_extrema(fund: dict,
                 overcome_pct: float = 0.03,
                 key: str = "Close") -> List[Tuple[int, float, TrendType]]:
@@ -71,3 +80,118 @@ def get_extrema(fund: dict,
                 continue
 
     return extrema_tuples
+
+
+def _find_up_trend_reversal(data: np.ndarray,
+                            prices: list,
+                            start: int,
+                            down_factor: float) -> Tuple[int, int]:
+    """_find_up_trend_reversal
+
+    Within an up trend tracked from 'start', the tracker is the running max, and the trend reverses
+    on the first bar below the running max (of the bars before it) times down_factor. Short trends
+    are scanned bar by bar, longer ones in vectorized chunks that double in size.
+
+    Args:
+        data (np.ndarray): price
+        prices (list): same price, as a list (cheaper to index one at a time)
+        start (int): index that started the up trend
+        down_factor (float): 1.0 - overcome_pct
+
+    Returns:
+        Tuple[int, int]: index of the reversal (-1 if the trend is still on), index of the max
+    """
+    max_index = start
+    max_value = prices[start]
+    scan_end = min(start + 1 + EXTREMA_SCAN_SIZE, len(prices))
+    for i in range(start + 1, scan_end):
+        if prices[i] > max_value:
+            max_index = i
+            max_value = prices[i]
+        elif prices[i] < max_value * down_factor:
+            return i, max_index
+
+    low = scan_end
+    chunk_size = 2 * EXTREMA_SCAN_SIZE
+    while low < len(prices):
+        high = min(low + chunk_size, len(prices))
+        running_max = np.maximum(np.maximum.accumulate(data[low:high]), max_value)
+        previous_max = np.concatenate(([max_value], running_max[:-1]))
+        reversals = np.flatnonzero(data[low:high] < previous_max * down_factor)
+        if len(reversals) > 0:
+            reversal = low + int(reversals[0])
+            return reversal, start + int(np.argmax(data[start:reversal]))
+        max_value = running_max[-1]
+        low = high
+        chunk_size *= 2
+    return -1, max_index
+
+
+def _get_threshold_extrema(data: np.ndarray,
+                           prices: list,
+                           next_rises: list,
+                           overcome_pct: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """ Extrema arrays of a single threshold, jumping from one trend change to the next """
+    indexes = []
+    trends = []
+
+    triggers = np.flatnonzero(np.logical_or(data[1:] > data[0] * (1.0 + overcome_pct),
+                                            data[1:] < data[0] * (1.0 - overcome_pct)))
+    start = int(triggers[0]) + 1 if len(triggers) > 0 else -1
+    trend = TREND_CODES[TrendType.UP] if start > 0 and \
+        prices[start] > data[0] * (1.0 + overcome_pct) else TREND_CODES[TrendType.DOWN]
+
+    while start > 0:
+        if trend == TREND_CODES[TrendType.DOWN]:
+            # The tracker follows every new min, so a down trend reverses on the first bar that
+            # isn't lower than the one before it
+            start = next_rises[start]
+            if start > 0:
+                indexes.append(start - 1)
+                trends.append(trend)
+                trend = TREND_CODES[TrendType.UP]
+        else:
+            start, max_index = _find_up_trend_reversal(data, prices, start, 1.0 - overcome_pct)
+            if start > 0:
+                indexes.append(max_index)
+                trends.append(trend)
+                trend = TREND_CODES[TrendType.DOWN]
+
+    indexes = np.array(indexes, dtype=int)
+    return indexes, data[indexes], np.array(trends, dtype=np.int8)
+
+
+def get_extrema_by_thresholds(
+        fund: dict,
+        overcome_pcts: List[float],
+        key: str = "Close") -> List[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """get_extrema_by_thresholds
+
+    Multi-threshold version of get_extrema (e.g. for a ladder of 1% to 20% thresholds). Rather
+    than stepping every bar, each threshold jumps from one trend change to the next, with the
+    data prepared once for all thresholds. Extrema match get_extrema for positive prices and
+    thresholds.
+
+    Args:
+        fund (dict): ticker data dict
+        overcome_pcts (List[float]): thresholds; price needs to overcome each percent to trigger
+            a new direction
+        key (str, optional): key of the ticker data dict. Defaults to "Close".
+
+    Returns:
+        List[Tuple[np.ndarray, np.ndarray, np.ndarray]]: per threshold, extrema points as arrays
+            of (indexes, values, trend codes), with trend codes from TREND_CODES
+    """
+    data = np.asarray(fund[key], dtype=float)
+    if len(data) < 2:
+        return [(np.empty(0, dtype=int), np.empty(0), np.empty(0, dtype=np.int8))
+                for _ in overcome_pcts]
+
+    # For every bar, the next bar (after it) that isn't lower than the one before it
+    rises = np.flatnonzero(data[1:] >= data[:-1]) + 1
+    next_rises = np.append(rises, -1)[np.searchsorted(rises, np.arange(1, len(data) + 1))]
+
+    prices = data.tolist()
+    next_rises = next_rises.tolist()
+    return [_get_threshold_extrema(data, prices, next_rises, overcome_pct)
+            for overcome_pct in overcome_pcts]
@@ -2,12 +2,49 @@
 
 Module that houses all applicable filtering and moving average functions
 """
+import abc
+from typing import List, Tuple, Union
+
 import numpy as np
+from scipy.signal import lfilter
+
+# Points per block of the intelligent moving average kernel (sets the size of its scratch buffers)
+IMA_BLOCK_SIZE = 16384
+
+
+def simple_moving_average_array(data: np.ndarray, filter_size: int = 50) -> np.ndarray:
+    """simple_moving_average_array
+
+    Linear-time simple moving average built on a running (cumulative) sum. Indexes below
+    filter_size - 1 are "warm-up" points and simply carry the raw data value.
+
+    Args:
+        data (np.ndarray): data array to be filtered
+        filter_size (int, optional): size of sma filter in indexes. Defaults to 50.
+
+    Returns:
+        np.ndarray: filtered data
+    """
+    data = np.asarray(data, dtype=float)
+    filtered = data.copy()
+    if filter_size < 1 or len(data) < filter_size:
+        return filtered
+
+    # Offsetting by the first value keeps the running sum small on long histories, which limits
+    # floating point drift in the windowed differences.
+    offset = data[0]
+    running_sum = np.zeros(len(data) + 1)
+    np.cumsum(data - offset, out=running_sum[1:])
+    filtered[filter_size - 1:] = \
+        (running_sum[filter_size:] - running_sum[:-filter_size]) / filter_size + offset
+    return filtered
 
 
 def simple_moving_average_filter(data: list, filter_size: int = 50) -> list:
     """simple_moving_average_filter
 
+    List-compatible wrapper of simple_moving_average_array.
+
     Args:
         data (list): data array to be filtered
         filter_size (int, optional): size of sma filter in indexes. Defaults to 50.
@@ -15,11 +52,42 @@ def simple_moving_average_filter(data: list, filter_size: int = 50) -> list:
     Returns:
         list: filtered data
     """
-    filtered = [0.0] * len(data)
-    for i in range(0, filter_size - 1):
-        filtered[i] = data[i]
-    for i in range(filter_size - 1, len(data)):
-        filtered[i] = np.average(data[i - (filter_size - 1):i + 1])
+    return simple_moving_average_array(data, filter_size=filter_size).tolist()
+
+
+def exponential_moving_average_array(data: np.ndarray,
+                                     filter_size: int = 50,
+                                     smoothing_coeff: float = 2.0) -> np.ndarray:
+    """exponential_moving_average_array
+
+    The EMA recurrence y[i] = K * x[i] + (1 - K) * y[i-1] is a first-order IIR filter, so it is
+    run as a single lfilter pass seeded with the simple average of the first filter_size points.
+
+    A 2-D array is filtered column-wise (axis 0 is time), so many tickers' aligned series can be
+    filtered in one call.
+
+    Args:
+        data (np.ndarray): data array (1-D) or matrix of time x series (2-D) to be filtered
+        filter_size (int, optional): size of ema filter in indexes. Defaults to 50.
+        smoothing_coeff (float, optional): ema coefficient, K. Defaults to 2.0.
+
+    Returns:
+        np.ndarray: filtered data, same shape as data
+    """
+    data = np.asarray(data, dtype=float)
+    filtered = data.copy()
+    if filter_size < 1 or len(data) < filter_size:
+        return filtered
+
+    coeff = smoothing_coeff / (float(filter_size) + 1.0)
+    seed = np.average(data[0:filter_size], axis=0)
+    filtered[filter_size - 1] = seed
+
+    # Initial state of the transposed direct form so that the first output uses the seed as y[-1]
+    initial_state = np.expand_dims((1.0 - coeff) * seed, axis=0)
+    filtered[filter_size:], _ = lfilter(
+        [coeff], [1.0, -(1.0 - coeff)], data[filter_size:], axis=0, zi=initial_state
+    )
     return filtered
 
 
@@ -29,6 +97,7 @@ def exponential_moving_average_filter(data: list,
     """exponential_moving_average_filter
 
     Exponential MA is a tighter-to-signal dataset than the traditional simple moving average.
+    List-compatible wrapper of exponential_moving_average_array.
 
     Args:
         data (list): data array to be filtered
@@ -38,20 +107,52 @@ def exponential_moving_average_filter(data: list,
     Returns:
         list: filtered data
     """
-    filtered = [0.0] * len(data)
-    coeff = smoothing_coeff / (float(filter_size) + 1.0)
-    for i in range(0, filter_size - 1):
-        filtered[i] = data[i]
-    filtered[filter_size - 1] = np.average(data[0:filter_size])
-    for i in range(filter_size, len(data)):
-        filtered[i] = float(data[i]) * coeff + filtered[i-1] * (1.0 - coeff)
+    return exponential_moving_average_array(
+        data, filter_size=filter_size, smoothing_coeff=smoothing_coeff
+    ).tolist()
+
+
+def weighted_moving_average_array(data: np.ndarray,
+                                  filter_size: int = 50,
+                                  first_index: int = 0) -> np.ndarray:
+    """weighted_moving_average_array
+
+    Linear-time weighted moving average. Weights are the absolute index (j + 1) of each point, so
+    the windowed sum of x[j] * (j + 1) is taken from a running sum and the divisor (the sum of
+    the weights in the window) has a closed form.
+
+    Args:
+        data (np.ndarray): data array to be filtered
+        filter_size (int, optional): size of wma filter in indexes. Defaults to 50.
+        first_index (int, optional): absolute index of data[0], when data is the tail of a longer
+            data set (as in the streaming filters). Defaults to 0.
+
+    Returns:
+        np.ndarray: filtered data
+    """
+    data = np.asarray(data, dtype=float)
+    filtered = data.copy()
+    if filter_size < 1 or len(data) < filter_size:
+        return filtered
+
+    # The weights are normalized, so offsetting the data by a constant offsets the result by the
+    # same constant; doing so keeps the running sum of x[j] * (j + 1) from growing needlessly.
+    offset = data[0]
+    weights = np.arange(first_index + 1.0, first_index + len(data) + 1.0)
+    running_sum = np.zeros(len(data) + 1)
+    np.cumsum((data - offset) * weights, out=running_sum[1:])
+
+    sum_val = running_sum[filter_size:] - running_sum[:-filter_size]
+    sum_div = filter_size * weights[filter_size - 1:] - filter_size * (filter_size - 1) / 2.0
+    filtered[filter_size - 1:] = sum_val / sum_div + offset
     return filtered
 
 
 def weighted_moving_average_filter(data: list, filter_size: int = 50) -> list:
     """weighted_moving_average_filter
 
-    Filter where linearly the most emphasis is on the latest data point
+    Filter where linearly the most emphasis is on the latest data point. List-compatible wrapper
+    of weighted_moving_average_array.
 
     Args:
         data (list): data array to be filtered
@@ -60,17 +161,162 @@ def weighted_moving_average_filter(data: list, filter_size: int = 50) -> list:
     Returns:
         list: filtered data
     """
-    filtered = [0.0] * len(data)
-    for i in range(0, filter_size - 1):
-        filtered[i] = data[i]
-    for i in range(filter_size - 1, len(data)):
-        sum_val = 0.0
-        sum_div = 0.0
-        for j in range(i - (filter_size-1), i+1):
-            sum_val += data[j] * (float(j) + 1.0)
-            sum_div += float(j) + 1.0
-        filtered[i] = sum_val / sum_div
-    return filtered
+    return weighted_moving_average_array(data, filter_size=filter_size).tolist()
+
+
+def _fill_intelligent_moving_averages(data: np.ndarray,
+                                      filter_sizes: List[int],
+                                      rows: List[np.ndarray]):
+    """_fill_intelligent_moving_averages
+
+    Write the intelligent moving average of each filter size into its row. Data is walked in
+    blocks of IMA_BLOCK_SIZE points: each block extends the running sums of x and x[j] * (j + 1)
+    (kept, with the last max(filter_sizes) sums of the previous blocks, in scratch buffers that
+    are reused from block to block) and continues each EMA from its lfilter state. The block's
+    EMA is written straight into the rows, then the SMA and WMA window sums are added in place.
+    Data is offset by its first value to limit drift of the running sums on long histories.
+
+    Args:
+        data (np.ndarray): data array to be filtered (len(data) >= every filter size >= 1)
+        filter_sizes (List[int]): sizes of the filters
+        rows (List[np.ndarray]): buffers to write the results into, one per filter size
+    """
+    # pylint: disable=too-many-locals
+    offset = data[0]
+    history = max(filter_sizes)
+    block_size = min(IMA_BLOCK_SIZE, len(data))
+
+    # Running sums of S[lo + 1 - history], ..., S[hi] (with S[0] = 0.0) for block [lo, hi)
+    running_sum = np.zeros(history + block_size)
+    weighted_running_sum = np.zeros(history + block_size)
+    centered = np.empty(block_size)
+    weighted = np.empty(block_size)
+    indexes = np.empty(block_size)
+    window_sum = np.empty(block_size)
+    weights = np.empty(block_size)
+
+    ema_states = []
+    for filter_size, row in zip(filter_sizes, rows):
+        # EMA, seeded with the simple average of the first window
+        coeff = 2.0 / (float(filter_size) + 1.0)
+        seed = np.average(data[0:filter_size])
+        row[0:filter_size - 1] = data[0:filter_size - 1]
+        row[filter_size - 1] = seed
+        ema_states.append([(1.0 - coeff) * seed])
+
+    for low in range(0, len(data), block_size):
+        high = min(low + block_size, len(data))
+        size = high - low
+        np.subtract(data[low:high], offset, out=centered[:size])
+        np.copyto(indexes[:size], np.arange(low + 1.0, high + 1.0))
+        np.multiply(centered[:size], indexes[:size], out=weighted[:size])
+        centered[0] += running_sum[history - 1]
+        weighted[0] += weighted_running_sum[history - 1]
+        np.cumsum(centered[:size], out=running_sum[history:history + size])
+        np.cumsum(weighted[:size], out=weighted_running_sum[history:history + size])
+
+        for position, (filter_size, row) in enumerate(zip(filter_sizes, rows)):
+            first = max(low, filter_size - 1)
+            if first >= high:
+                continue
+            ema_first = max(first, filter_size)
+            if ema_first < high:
+                coeff = 2.0 / (float(filter_size) + 1.0)
+                row[ema_first:high], ema_states[position] = lfilter(
+                    [coeff], [1.0, -(1.0 - coeff)], data[ema_first:high], zi=ema_states[position]
+                )
+
+            # S[i + 1] of output i is at i - low + history
+            start = first - low + history
+            end = high - low + history
+            window = window_sum[:high - first]
+
+            # SMA
+            np.subtract(running_sum[start:end], running_sum[start - filter_size:end - filter_size],
+                        out=window)
+            window /= filter_size
+            row[first:high] += window
+
+            # WMA, weighted by absolute index (j + 1)
+            np.subtract(weighted_running_sum[start:end],
+                        weighted_running_sum[start - filter_size:end - filter_size], out=window)
+            np.multiply(indexes[first - low:size], filter_size, out=weights[:high - first])
+            weights[:high - first] -= filter_size * (filter_size - 1) / 2.0
+            window /= weights[:high - first]
+            row[first:high] += window
+
+            # Both the SMA and WMA sums were taken on offset data
+            row[first:high] += 2.0 * offset
+            row[first:high] /= 3.0
+
+        # Carry the last sums over to the next block
+        running_sum[:history] = running_sum[size:size + history]
+        weighted_running_sum[:history] = weighted_running_sum[size:size + history]
+
+
+def intelligent_moving_average_array(data: np.ndarray,
+                                     filter_size: int = 50,
+                                     out: Union[np.ndarray, None] = None) -> np.ndarray:
+    """intelligent_moving_average_array
+
+    Fused kernel of the intelligent moving average. The SMA, EMA, and WMA are accumulated in
+    place into a single output buffer, block by block, so besides out the kernel only uses
+    scratch buffers of about filter_size + IMA_BLOCK_SIZE points, whatever the length of data.
+
+    Args:
+        data (np.ndarray): data array to be filtered
+        filter_size (int, optional): size of the filter. Defaults to 50.
+        out (Union[np.ndarray, None], optional): preallocated float buffer, same length as data,
+            to write the result into. Defaults to None.
+
+    Returns:
+        np.ndarray: filtered data (out, if supplied)
+    """
+    data = np.asarray(data, dtype=float)
+    if out is None:
+        out = np.empty(len(data))
+    elif out.shape != data.shape:
+        raise ValueError(f"out has shape {out.shape}, expected {data.shape}")
+
+    if filter_size < 1 or len(data) < filter_size:
+        out[:] = data
+        return out
+
+    _fill_intelligent_moving_averages(data, [filter_size], [out])
+    return out
+
+
+def intelligent_moving_average_bank(data: np.ndarray, filter_sizes: List[int]) -> np.ndarray:
+    """intelligent_moving_average_bank
+
+    Intelligent moving averages for a whole set of filter sizes. The running sums of each block
+    are computed once and shared by every filter size, which makes window-sensitivity studies
+    roughly one pass rather than one full recomputation per window.
+
+    Args:
+        data (np.ndarray): data array to be filtered
+        filter_sizes (List[int]): sizes of the filters
+
+    Returns:
+        np.ndarray: filtered data, shape (len(filter_sizes), len(data)). Row k is identical to
+            intelligent_moving_average_array(data, filter_sizes[k])
+    """
+    data = np.asarray(data, dtype=float)
+    bank = np.empty((len(filter_sizes), len(data)))
+    if len(data) == 0:
+        return bank
+
+    valid_rows = []
+    for row, filter_size in enumerate(filter_sizes):
+        if filter_size < 1 or len(data) < filter_size:
+            bank[row] = data
+        else:
+            valid_rows.append(row)
+    if valid_rows:
+        _fill_intelligent_moving_averages(
+            data, [filter_sizes[row] for row in valid_rows], [bank[row] for row in valid_rows]
+        )
+    return bank
 
 
 def intelligent_moving_average(data: list, filter_size: int = 50) -> list:
@@ -83,6 +329,8 @@ def intelligent_moving_average(data: list, filter_size: int = 50) -> list:
 
     If sized correctly, this should become a major support line for the trend of a price data set.
 
+    List-compatible wrapper of intelligent_moving_average_array.
+
     Args:
         data (list): data array to be filtered
         filter_size (int, optional): size of the filter. Defaults to 50.
@@ -90,11 +338,7 @@ def intelligent_moving_average(data: list, filter_size: int = 50) -> list:
     Returns:
         list: filtered data
     """
-    sma = simple_moving_average_filter(data, filter_size=filter_size)
-    ema = exponential_moving_average_filter(data, filter_size=filter_size)
-    wma = weighted_moving_average_filter(data, filter_size=filter_size)
-    filtered = [(ema[i] + wma[i] + sma[i]) / 3.0 for i in range(len(data))]
-    return filtered
+    return intelligent_moving_average_array(data, filter_size=filter_size).tolist()
 
 
 def get_slope_of_data_set(data_set: list) -> list:
@@ -112,3 +356,258 @@ def get_slope_of_data_set(data_set: list) -> list:
     for i in range(1, len(data_set)):
         slope[i] = data_set[i] - data_set[i-1]
     return slope
+
+
+##########################################################################################
+# STREAMING (STATEFUL) FILTERS
+##########################################################################################
+
+class _FilterStream(abc.ABC):
+    """ Common bits of the streaming filters: one value or a chunk of values at a time, with
+    bounded memory, and a JSON-compatible state (to_dict / from_dict) """
+    # Attributes that hold other filter streams (name -> class)
+    _streams: dict = {}
+
+    def update(self, values: Union[float, list, np.ndarray]) -> Union[float, np.ndarray]:
+        """update
+
+        Feed the next value or chunk of values. Outputs match the batch function over the full
+        history of values fed so far.
+
+        Args:
+            values (Union[float, list, np.ndarray]): next value, or chunk of values
+
+        Returns:
+            Union[float, np.ndarray]: filtered value (for a single value) or values (for a chunk)
+        """
+        if np.ndim(values) == 0:
+            return self._update_value(float(values))
+        chunk = np.asarray(values, dtype=float)
+        if len(chunk) == 0:
+            return np.empty(0)
+        return self._update_chunk(chunk)
+
+    @abc.abstractmethod
+    def _update_value(self, value: float) -> float:
+        """ filtered value of the next value """
+
+    @abc.abstractmethod
+    def _update_chunk(self, chunk: np.ndarray) -> np.ndarray:
+        """ filtered values of the next (non-empty) chunk of values """
+
+    def to_dict(self) -> dict:
+        """ JSON-compatible dictionary of the filter state """
+        state = {}
+        for key, value in vars(self).items():
+            if key in self._streams:
+                state[key] = value.to_dict()
+            elif isinstance(value, np.ndarray):
+                state[key] = value.tolist()
+            else:
+                state[key] = value
+        return state
+
+    @classmethod
+    def from_dict(cls, state: dict):
+        """ Rebuild the filter from a dictionary made by to_dict """
+        stream = cls.__new__(cls)
+        for key, value in state.items():
+            if key in cls._streams:
+                value = cls._streams[key].from_dict(value)
+            elif isinstance(value, list):
+                value = np.array(value, dtype=float)
+            setattr(stream, key, value)
+        return stream
+
+
+class _WindowFilterStream(_FilterStream):
+    """ Streaming filter over a sliding window, kept in a fixed-size ring buffer """
+    # pylint: disable=abstract-method
+
+    def __init__(self, filter_size: int = 50):
+        self.filter_size = filter_size
+        self.count = 0
+        self.position = 0
+        self.history = np.zeros(filter_size)
+
+    def _push_value(self, value: float) -> float:
+        """ Add a value to the ring buffer, returning the value that drops out of the window """
+        oldest = self.history[self.position]
+        self.history[self.position] = value
+        self.position = (self.position + 1) % self.filter_size
+        self.count += 1
+        return oldest
+
+    def _push_chunk(self, chunk: np.ndarray) -> Tuple[np.ndarray, int, int]:
+        """_push_chunk
+
+        Add a chunk of values to the ring buffer
+
+        Returns:
+            Tuple[np.ndarray, int, int]: previous (up to filter_size - 1) values followed by the
+                chunk, the number of previous values, and the global index of the first value
+        """
+        num_previous = min(self.count, self.filter_size - 1)
+        if self.count < self.filter_size:
+            previous = self.history[self.count - num_previous:self.count]
+        else:
+            previous = np.roll(self.history, -self.position)[self.filter_size - num_previous:]
+        combined = np.concatenate((previous, chunk))
+        first_index = self.count - num_previous
+
+        self.count += len(chunk)
+        self.history = np.zeros(self.filter_size)
+        if self.count >= self.filter_size:
+            self.position = self.count % self.filter_size
+            self.history[:] = np.roll(combined[-self.filter_size:], self.position)
+        else:
+            self.position = self.count
+            self.history[0:self.count] = combined
+        return combined, num_previous, first_index
+
+
+class SimpleMovingAverageStream(_WindowFilterStream):
+    """ Streaming counterpart of simple_moving_average_filter (ring buffer and running sum) """
+
+    def __init__(self, filter_size: int = 50):
+        super().__init__(filter_size)
+        self.running_sum = 0.0
+
+    def _update_value(self, value: float) -> float:
+        self.running_sum += value - self._push_value(value)
+        if self.count % self.filter_size == 0:
+            # Re-sync so rounding error of the running sum can't build up on long feeds
+            self.running_sum = float(np.sum(self.history))
+        if self.count < self.filter_size:
+            return value
+        return self.running_sum / self.filter_size
+
+    def _update_chunk(self, chunk: np.ndarray) -> np.ndarray:
+        # Either the previous values fill a whole warm-up, or they are the full history, so the
+        # batch function over them gives the right warm-up for every point of the chunk
+        combined, num_previous, _ = self._push_chunk(chunk)
+        self.running_sum = float(np.sum(self.history))
+        return simple_moving_average_array(combined, self.filter_size)[num_previous:]
+
+
+class WeightedMovingAverageStream(_WindowFilterStream):
+    """ Streaming counterpart of weighted_moving_average_filter (ring buffer and running sum of
+    x[j] * (j + 1)) """
+
+    def __init__(self, filter_size: int = 50):
+        super().__init__(filter_size)
+        self.running_sum = 0.0
+
+    def _sync_running_sum(self):
+        """ Recompute the running weighted sum from the ring buffer """
+        window_size = min(self.count, self.filter_size)
+        ordered = np.roll(self.history, -self.position)[self.filter_size - window_size:] \
+            if self.count >= self.filter_size else self.history[0:self.count]
+        weights = np.arange(self.count - window_size + 1.0, self.count + 1.0)
+        self.running_sum = float(np.sum(ordered * weights))
+
+    def _update_value(self, value: float) -> float:
+        index = self.count
+        oldest = self._push_value(value)
+        # The oldest value (index - filter_size) carries weight (index - filter_size + 1)
+        self.running_sum += value * (index + 1.0) - oldest * (index - self.filter_size + 1.0)
+        if self.count % self.filter_size == 0:
+            # Re-sync so rounding error of the running sum can't build up on long feeds
+            self._sync_running_sum()
+        if self.count < self.filter_size:
+            return value
+        sum_div = self.filter_size * (index + 1.0) - self.filter_size * (self.filter_size - 1) / 2.0
+        return self.running_sum / sum_div
+
+    def _update_chunk(self, chunk: np.ndarray) -> np.ndarray:
+        combined, num_previous, first_index = self._push_chunk(chunk)
+        self._sync_running_sum()
+        return weighted_moving_average_array(
+            combined, self.filter_size, first_index=first_index)[num_previous:]
+
+
+class ExponentialMovingAverageStream(_FilterStream):
+    """ Streaming counterpart of exponential_moving_average_filter """
+
+    def __init__(self, filter_size: int = 50, smoothing_coeff: float = 2.0):
+        self.filter_size = filter_size
+        self.coeff = smoothing_coeff / (float(filter_size) + 1.0)
+        self.count = 0
+        self.seed_values = np.zeros(filter_size)
+        self.previous = 0.0
+
+    def _update_value(self, value: float) -> float:
+        index = self.count
+        self.count += 1
+        if index < self.filter_size - 1:
+            self.seed_values[index] = value
+            return value
+        if index == self.filter_size - 1:
+            self.seed_values[index] = value
+            self.previous = float(np.average(self.seed_values))
+            return self.previous
+        self.previous = value * self.coeff + self.previous * (1.0 - self.coeff)
+        return self.previous
+
+    def _update_chunk(self, chunk: np.ndarray) -> np.ndarray:
+        filtered = np.empty(len(chunk))
+        # Warm-up (at most filter_size values) goes value by value
+        num_warm_up = min(max(self.filter_size - self.count, 0), len(chunk))
+        for i in range(num_warm_up):
+            filtered[i] = self._update_value(chunk[i])
+        if num_warm_up == len(chunk):
+            return filtered
+
+        filtered[num_warm_up:], _ = lfilter(
+            [self.coeff], [1.0, -(1.0 - self.coeff)], chunk[num_warm_up:],
+            zi=[(1.0 - self.coeff) * self.previous]
+        )
+        self.count += len(chunk) - num_warm_up
+        self.previous = float(filtered[-1])
+        return filtered
+
+
+class IntelligentMovingAverageStream(_FilterStream):
+    """ Streaming counterpart of intelligent_moving_average """
+    _streams = {
+        'sma': SimpleMovingAverageStream,
+        'ema': ExponentialMovingAverageStream,
+        'wma': WeightedMovingAverageStream
+    }
+
+    def __init__(self, filter_size: int = 50):
+        self.sma = SimpleMovingAverageStream(filter_size)
+        self.ema = ExponentialMovingAverageStream(filter_size)
+        self.wma = WeightedMovingAverageStream(filter_size)
+
+    def _update_value(self, value: float) -> float:
+        return (self.ema.update(value) + self.wma.update(value) + self.sma.update(value)) / 3.0
+
+    def _update_chunk(self, chunk: np.ndarray) -> np.ndarray:
+        filtered = self.ema.update(chunk)
+        filtered += self.wma.update(chunk)
+        filtered += self.sma.update(chunk)
+        filtered /= 3.0
+        return filtered
+
+
+class SlopeStream(_FilterStream):
+    """ Streaming counterpart of get_slope_of_data_set """
+
+    def __init__(self):
+        self.count = 0
+        self.previous = 0.0
+
+    def _update_value(self, value: float) -> float:
+        slope = value - self.previous if self.count > 0 else 0.0
+        self.count += 1
+        self.previous = value
+        return slope
+
+    def _update_chunk(self, chunk: np.ndarray) -> np.ndarray:
+        slope = np.diff(chunk, prepend=self.previous)
+        if self.count == 0:
+            slope[0] = 0.0
+        self.count += len(chunk)
+        self.previous = float(chunk[-1])
+        return slope
@@ -2,13 +2,80 @@
 
 Derive the fourier spectrum of a dataset
 """
-from typing import Tuple
+from typing import Dict, Tuple
 
 import numpy as np
-from scipy.fft import fft, fftfreq
+from scipy.fft import rfft, rfftfreq, next_fast_len
 
 
-def get_fourier_spectrum(data_set: dict, key: str = 'Close') -> Tuple[np.ndarray, np.ndarray, list]:
+def _get_top_period_matrix(x_fft: np.ndarray,
+                           y_spectra: np.ndarray,
+                           data_length: int,
+                           num_periods: int) -> np.ndarray:
+    """_get_top_period_matrix
+
+    Row-wise top periods of a (series x frequencies) spectra matrix, strongest first, with equal
+    powers in ascending frequency order (as a stable sort of the full row would give). Uses a
+    partial sort (partition) to find each row's cutoff power, so only the entries at or above it
+    (every tie at the cutoff included) are ever fully sorted.
+
+    Args:
+        x_fft (np.ndarray): frequencies, shared by every row
+        y_spectra (np.ndarray): power spectra, one row per series
+        data_length (int): length of the original data sets (stands in for the infinite period of
+            the zero frequency)
+        num_periods (int): number of periods per row (<= number of frequencies)
+
+    Returns:
+        np.ndarray: top periods (not frequencies), shape (rows, num_periods)
+    """
+    cutoffs = -np.partition(-y_spectra, num_periods - 1, axis=1)[:, num_periods - 1]
+    is_candidate = y_spectra >= cutoffs[:, np.newaxis]
+
+    # Candidates first, in ascending frequency order (a stable sort of booleans is a linear-time
+    # radix sort); rows with fewer candidates than the widest row pad with weaker entries, which
+    # sort after their own candidates
+    num_candidates = int(is_candidate.sum(axis=1).max())
+    candidates = np.argsort(~is_candidate, axis=1, kind='stable')[:, 0:num_candidates]
+    order = np.argsort(
+        -np.take_along_axis(y_spectra, candidates, axis=1), axis=1, kind='stable')
+    top_indexes = np.take_along_axis(candidates, order[:, 0:num_periods], axis=1)
+    top_frequencies = x_fft[top_indexes]
+
+    # Skip the first frequency, as it would be an infinite period
+    periods = np.full(top_frequencies.shape, data_length * 10.0)
+    np.divide(1.0, top_frequencies, out=periods, where=top_frequencies != 0)
+    return periods
+
+
+def get_top_periods(x_fft: np.ndarray,
+                    y_spectrum: np.ndarray,
+                    data_length: int,
+                    num_periods: int = 10) -> list:
+    """get_top_periods
+
+    Periods of the strongest 'num_periods' frequencies of a spectrum, strongest first.
+
+    Args:
+        x_fft (np.ndarray): frequencies
+        y_spectrum (np.ndarray): power spectrum matching x_fft
+        data_length (int): length of the original data set (stands in for the infinite period of
+            the zero frequency)
+        num_periods (int, optional): number of periods to return. Defaults to 10.
+
+    Returns:
+        list: top periods (not frequencies)
+    """
+    num_periods = min(num_periods, len(y_spectrum))
+    if num_periods == 0:
+        return []
+    return _get_top_period_matrix(
+        x_fft, y_spectrum[np.newaxis, :], data_length, num_periods)[0].tolist()
+
+
+def get_fourier_spectrum(data_set: dict,
+                         key: str = 'Close',
+                         pad_to_fast_length: bool = False) -> Tuple[np.ndarray, np.ndarray, list]:
     """get_fourier_spectrum
 
     Get the fourier spectrum of a data set. This is helpful for finding a variance filter size as
@@ -18,6 +85,9 @@ def get_fourier_spectrum(data_set: dict, key: str = 'Close') -> Tuple[np.ndarray
     Args:
         data_set (dict): ticker data set
         key (str, optional): key of the ticker data set to obtain the spectrum. Defaults to 'Close'.
+        pad_to_fast_length (bool, optional): zero-pad the data to the next fast FFT length. This
+            speeds up awkward (e.g. large prime) lengths, at the cost of a slightly different
+            frequency grid. Defaults to False.
 
     Returns:
         Tuple[np.ndarray, np.ndarray, list]:
@@ -25,15 +95,83 @@ def get_fourier_spectrum(data_set: dict, key: str = 'Close') -> Tuple[np.ndarray
             list of power spectra (y),
             list of the top 10 periods (not frequencies) derived in the function
     """
-    data_set = data_set[key]
-    x_data = range(0, len(data_set))
-    y_fft = fft(data_set)
-    x_fft = fftfreq(len(x_data), 1.0)[:len(x_data)//2]
-    y_spectrum = 2.0 / len(x_data) * np.abs(y_fft[0:len(x_data)//2])
-
-    zipped = list(zip(x_fft, y_spectrum))
-    sorted_zip = sorted(zipped, key=lambda x: x[1], reverse=True)
-    # Skip the first frequency, as it would be an infinite period
-    top_10_periods = [
-        1.0 / pair[0] if pair[0] != 0 else len(data_set) * 10.0 for pair in sorted_zip[0:10]]
+    data_set = np.asarray(data_set[key], dtype=float)
+    num_points = len(data_set)
+    fft_length = next_fast_len(num_points, real=True) if pad_to_fast_length else num_points
+
+    # Input is real, so only the non-negative half of the spectrum needs computing
+    y_fft = rfft(data_set, n=fft_length)
+    x_fft = rfftfreq(fft_length, 1.0)[:fft_length//2]
+    y_spectrum = 2.0 / num_points * np.abs(y_fft[0:fft_length//2])
+
+    top_10_periods = get_top_periods(x_fft, y_spectrum, num_points)
     return x_fft, y_spectrum, top_10_periods
+
+
+def get_fourier_spectrum_batch(data_matrix: np.ndarray,
+                               num_periods: int = 10,
+                               pad_to_fast_length: bool = False) -> Tuple[
+                                   np.ndarray, np.ndarray, np.ndarray]:
+    """get_fourier_spectrum_batch
+
+    Batched get_fourier_spectrum for many aligned series (e.g. tickers over the same dates) in a
+    single vectorized FFT call.
+
+    Args:
+        data_matrix (np.ndarray): data of shape (series x time)
+        num_periods (int, optional): number of top periods per series. Defaults to 10.
+        pad_to_fast_length (bool, optional): zero-pad the data to the next fast FFT length.
+            Defaults to False.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]:
+            list of frequencies (x),
+            matrix of power spectra (series x frequencies),
+            matrix of the top periods (series x num_periods), strongest first
+    """
+    data_matrix = np.atleast_2d(np.asarray(data_matrix, dtype=float))
+    num_points = data_matrix.shape[1]
+    fft_length = next_fast_len(num_points, real=True) if pad_to_fast_length else num_points
+
+    y_fft = np.asarray(rfft(data_matrix, n=fft_length, axis=1))
+    x_fft = rfftfreq(fft_length, 1.0)[:fft_length//2]
+    y_spectra = 2.0 / num_points * np.abs(y_fft[:, 0:fft_length//2])
+
+    num_periods = min(num_periods, len(x_fft))
+    if num_periods == 0:
+        return x_fft, y_spectra, np.empty((data_matrix.shape[0], 0))
+    top_periods = _get_top_period_matrix(x_fft, y_spectra, num_points, num_periods)
+    return x_fft, y_spectra, top_periods
+
+
+def get_top_periods_by_ticker(data_sets: Dict[str, np.ndarray],
+                              num_periods: int = 10,
+                              pad_to_fast_length: bool = False) -> Dict[str, list]:
+    """get_top_periods_by_ticker
+
+    Top periods for a ragged collection of series. Series are grouped by length, and each group
+    is run through get_fourier_spectrum_batch as one FFT call.
+
+    Args:
+        data_sets (Dict[str, np.ndarray]): series keyed by ticker (lengths may differ)
+        num_periods (int, optional): number of top periods per series. Defaults to 10.
+        pad_to_fast_length (bool, optional): zero-pad the data to the next fast FFT length.
+            Defaults to False.
+
+    Returns:
+        Dict[str, list]: top periods (strongest first) keyed by ticker
+    """
+    groups = {}
+    for ticker, data_set in data_sets.items():
+        groups.setdefault(len(data_set), []).append(ticker)
+
+    top_periods = {}
+    for tickers in groups.values():
+        _, _, group_periods = get_fourier_spectrum_batch(
+            np.array([data_sets[ticker] for ticker in tickers], dtype=float),
+            num_periods=num_periods,
+            pad_to_fast_length=pad_to_fast_length
+        )
+        for ticker, periods in zip(tickers, group_periods):
+            top_periods[ticker] = periods.tolist()
+    return top_periods
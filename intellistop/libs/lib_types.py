@@ -2,17 +2,21 @@
 from enum import Enum
 from typing import Union, List
 
+import numpy as np
+
 from .constants import YF_DATA_CONFIG_DEFAULTS
 
 class YFProperties:
     """ Yahoo Finance Properties """
-    # pylint: disable=too-few-public-methods
+    # pylint: disable=too-few-public-methods,too-many-instance-attributes
     period: str = YF_DATA_CONFIG_DEFAULTS["period"]
     interval: str = YF_DATA_CONFIG_DEFAULTS["interval"]
     start_date: Union[str,None] = None
     end_date: Union[str,None] = None
     num_samples_per_calendar_year: int = 0
     include_bench: bool = False
+    use_cache: bool = False
+    cache_dir: Union[str, None] = None
 
     def __init__(self):
         # We're assuming 1 of everything. Note "m" is minute
@@ -57,22 +61,64 @@ class VFStopLossRawResultType:
         self.vf = 0.0
 
 class VFTimeSeriesType:
-    """ Volatility Factor Time Series Type """
-    # pylint: disable=too-few-public-methods
+    """ Volatility Factor Time Series Type
+
+    Array-backed: a segment only stores its running max (typically a view into one buffer shared
+    by every segment of a fund) and its start index. The caution, stop loss, and conservative lines
+    are constant factors of the running max, so they are computed on first access, and the time
+    indexes are a contiguous range.
+    """
+    # pylint: disable=too-many-instance-attributes
     max_price: float
     max_price_index: int
-    caution_line: List[float]
-    stop_loss_line: List[float]
-    conservative_line: List[float]
-    time_index_list: List[int]
-
-    def __init__(self):
+    running_max: np.ndarray
+    start_index: int
+    volatility_factor: float
+    min_vf: float
+
+    def __init__(self,
+                 running_max: Union[np.ndarray, None] = None,
+                 start_index: int = 0,
+                 volatility_factor: float = 0.0,
+                 min_vf: float = 0.0):
         self.max_price = 0.0
         self.max_price_index = 0
-        self.caution_line = []
-        self.stop_loss_line = []
-        self.conservative_line = []
-        self.time_index_list = []
+        self.running_max = running_max if running_max is not None else np.empty(0)
+        self.start_index = start_index
+        self.volatility_factor = volatility_factor
+        self.min_vf = min_vf
+        self._lines = {}
+
+    def __getstate__(self) -> dict:
+        # The lines are cheap to recompute, so leave them out when pickling (e.g. process pools)
+        state = self.__dict__.copy()
+        state['_lines'] = {}
+        return state
+
+    def _get_line(self, name: str, factor: float) -> np.ndarray:
+        if name not in self._lines:
+            self._lines[name] = self.running_max * factor
+        return self._lines[name]
+
+    @property
+    def caution_line(self) -> np.ndarray:
+        """ caution line: 60% of a drop from the running max to the stop loss """
+        return self._get_line('caution', 1.0 - (0.6 * self.volatility_factor / 100.0))
+
+    @property
+    def stop_loss_line(self) -> np.ndarray:
+        """ stop loss line: running max less the VF % """
+        return self._get_line('stop_loss', 1.0 - (self.volatility_factor / 100.0))
+
+    @property
+    def conservative_line(self) -> np.ndarray:
+        """ conservative line: running max less the historical (min) VF % """
+        return self._get_line('conservative', 1.0 - (self.min_vf / 100.0))
+
+    @property
+    def time_index_list(self) -> range:
+        """ indexes (of the full price data set) covered by this segment """
+        return range(self.start_index, self.start_index + len(self.running_max))
 
 class StopLossEventType(Enum):
     """ Stop Loss Event Type Enumeration """
@@ -150,6 +196,43 @@ class IntelligentMovingAvgType:
         self.long_slope = []
 
 
+class VFSweepResultType:
+    """ Volatility Factor Sweep Result Type (one entry per parameter set of the grid) """
+    # pylint: disable=too-few-public-methods
+    volatility_factor: np.ndarray
+    min_vf: np.ndarray
+    error_zone_threshold: np.ndarray
+    num_stops: np.ndarray
+    time_in_market: np.ndarray
+    returns: np.ndarray
+
+    def __init__(self):
+        self.volatility_factor = np.empty(0)
+        self.min_vf = np.empty(0)
+        self.error_zone_threshold = np.empty(0)
+        self.num_stops = np.empty(0, dtype=int)
+        self.time_in_market = np.empty(0)
+        self.returns = np.empty(0)
+
+
+class VFLockStepResultType(VFSweepResultType):
+    """ Volatility Factor Lock-Step Result Type (one entry per fund of the universe) """
+    # pylint: disable=too-few-public-methods
+    is_active: np.ndarray
+    max_price: np.ndarray
+    max_price_index: np.ndarray
+    stop_loss: np.ndarray
+    in_market: np.ndarray
+
+    def __init__(self):
+        super().__init__()
+        self.is_active = np.empty(0, dtype=bool)
+        self.max_price = np.empty(0)
+        self.max_price_index = np.empty(0, dtype=int)
+        self.stop_loss = np.empty(0)
+        self.in_market = np.empty((0, 0), dtype=bool)
+
+
 class NewTickerDataStorageType:
     """ New Ticker Data Storage for Storage Class """
     # pylint: disable=too-few-public-methods
@@ -163,18 +246,63 @@ class NewTickerDataStorageType:
         self.current_max_price = max_close
 
 
+class TickerDataType(dict):
+    """ Ticker Data (one fund of format_data)
+
+    Columns ('Close', 'Open', ...) are numpy arrays and the dates are kept as datetime64[D] in
+    'dates'. The 'Date' column (date strings) is only made on demand, the first time it's used.
+    """
+
+    def __init__(self, columns: Union[dict, None] = None, dates: Union[np.ndarray, None] = None):
+        super().__init__(columns or {})
+        self.dates = np.empty(0, dtype='datetime64[D]') if dates is None else dates
+        self._date_strings = None
+
+    def __missing__(self, key):
+        if key != "Date":
+            raise KeyError(key)
+        if self._date_strings is None:
+            self._date_strings = np.datetime_as_string(self.dates, unit='D').tolist()
+        return self._date_strings
+
+    def __contains__(self, key) -> bool:
+        return key == "Date" or super().__contains__(key)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+
+class PriceCacheEntryType:
+    """ Cached price history of a ticker (for a given interval) """
+    # pylint: disable=too-few-public-methods
+    data: TickerDataType
+    covered_start: str
+    update_date: str
+
+    def __init__(self, data: TickerDataType, covered_start: str = "", update_date: str = ""):
+        # covered_start: start of the period the history was fully downloaded for ("" = max)
+        # update_date: time of the latest download (UPDATE_TIME_FORMAT, or a date for older caches)
+        self.data = data
+        self.covered_start = covered_start
+        self.update_date = update_date
+
+
 ################################################################
 
 class ConfigProperties:
     """ Configuration Properties (high-level configuration settings) """
     # pylint: disable=too-few-public-methods
-    yf_properties = YFProperties()
-    vf_properties = VFProperties()
+    yf_properties: YFProperties
+    vf_properties: VFProperties
 
     def __init__(self, config: Union[dict, None] = None):
         if not config:
             config = {}
 
+        # Per-instance properties, so one config's settings don't leak into another's
+        self.yf_properties = YFProperties()
+        self.vf_properties = VFProperties()
+
         self.yf_properties.interval = config.get("interval", self.yf_properties.interval)
         self.yf_properties.period = config.get("period", self.yf_properties.period)
         self.yf_properties.start_date = config.get("start_date")
@@ -183,5 +311,11 @@ class ConfigProperties:
             "include_bench",
             self.yf_properties.include_bench
         )
+        self.yf_properties.use_cache = config.get("use_cache", self.yf_properties.use_cache)
+        self.yf_properties.cache_dir = config.get("cache_dir", self.yf_properties.cache_dir)
 
         self.vf_properties.pricing = config.get("vf_properties_pricing", self.vf_properties.pricing)
+
+        # Source of price data: a provider name (see DATA_PROVIDERS) or a PriceDataProvider object
+        self.data_provider = config.get("data_provider", "yfinance")
+        self.data_provider_args = config.get("data_provider_args", {})
@@ -0,0 +1,261 @@
+""" price_cache.py
+
+On-disk cache of downloaded price history, one columnar (npz) file per ticker and interval, so that
+subsequent runs only need to download the bars after the last cached date.
+"""
+import os
+import re
+import datetime
+from typing import Union
+
+import numpy as np
+
+from .lib_types import PriceCacheEntryType, TickerDataType
+from .storage import STORAGE_DIR_NAME
+
+
+PRICE_CACHE_DIR_NAME = "price_cache"
+PRICE_CACHE_PATH = os.path.join(os.getcwd(), STORAGE_DIR_NAME, PRICE_CACHE_DIR_NAME)
+
+# Bars are keyed by (daily) dates, so intraday intervals ("m", "h") aren't cached
+CACHEABLE_INTERVALS = ("d", "wk", "mo")
+
+DATE_FORMAT = "%Y-%m-%d"
+UPDATE_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+# Cached history is refreshed once it's older than this (e.g. a run before the open, then one
+# after the close), or whenever its last bar is today's (possibly still forming) bar
+PRICE_CACHE_TTL = datetime.timedelta(hours=1)
+# Relative difference of a re-downloaded bar from its cached value that means the history has been
+# re-adjusted since it was cached (e.g. for a split or dividend)
+ADJUSTMENT_TOLERANCE = 1e-4
+# Columns that change for a completed bar when the history is re-adjusted
+ADJUSTED_COLUMNS = ("Open", "High", "Low", "Close", "Adj Close")
+
+COVERED_START_KEY = "__covered_start__"
+UPDATE_DATE_KEY = "__update_date__"
+
+
+def is_cacheable_interval(interval: str) -> bool:
+    """ True if bars of the interval are at least a day apart (daily, weekly, monthly) """
+    return interval.endswith(CACHEABLE_INTERVALS)
+
+
+def get_price_cache_path(ticker: str, interval: str, cache_dir: Union[str, None] = None) -> str:
+    """get_price_cache_path
+
+    Args:
+        ticker (str): ticker symbol (e.g. "AAPL", "^GSPC")
+        interval (str): yfinance interval (e.g. "1d")
+        cache_dir (Union[str, None], optional): cache directory. Defaults to PRICE_CACHE_PATH.
+
+    Returns:
+        str: path of the ticker's cache file
+    """
+    cache_dir = cache_dir or PRICE_CACHE_PATH
+    file_name = re.sub(r"[^\w\^\-\.=]", "_", ticker)
+    return os.path.join(cache_dir, f"{file_name}_{interval}.npz")
+
+
+def get_period_start_date(period: str,
+                          today: Union[datetime.date, None] = None) -> Union[str, None]:
+    """get_period_start_date
+
+    Start date of a yfinance period (e.g. "5y", "6mo", "60d", "ytd") that ends today
+
+    Args:
+        period (str): yfinance period
+        today (Union[datetime.date, None], optional): end of the period. Defaults to today.
+
+    Returns:
+        Union[str, None]: start date string, or None for the full history ("max")
+    """
+    today = today or datetime.date.today()
+    if period == "ytd":
+        return datetime.date(today.year, 1, 1).strftime(DATE_FORMAT)
+
+    match = re.fullmatch(r"(\d+)(d|wk|mo|y)", period)
+    if not match:
+        return None
+
+    amount = int(match.group(1))
+    if match.group(2) == "d":
+        start = today - datetime.timedelta(days=amount)
+    elif match.group(2) == "wk":
+        start = today - datetime.timedelta(weeks=amount)
+    else:
+        months = amount * 12 if match.group(2) == "y" else amount
+        year, month = divmod(today.year * 12 + today.month - 1 - months, 12)
+        # Clip the day for shorter months (e.g. Feb 29 -> Feb 28)
+        day = today.day
+        while True:
+            try:
+                start = datetime.date(year, month + 1, day)
+                break
+            except ValueError:
+                day -= 1
+    return start.strftime(DATE_FORMAT)
+
+
+def load_price_cache(ticker: str,
+                     interval: str,
+                     cache_dir: Union[str, None] = None) -> Union[PriceCacheEntryType, None]:
+    """load_price_cache
+
+    Args:
+        ticker (str): ticker symbol
+        interval (str): yfinance interval
+        cache_dir (Union[str, None], optional): cache directory. Defaults to PRICE_CACHE_PATH.
+
+    Returns:
+        Union[PriceCacheEntryType, None]: cached history (in download_data's ticker format), or
+            None if the ticker isn't cached
+    """
+    path = get_price_cache_path(ticker, interval, cache_dir)
+    if not os.path.exists(path):
+        return None
+
+    with np.load(path, allow_pickle=False) as cache_file:
+        data = TickerDataType(
+            {
+                key: cache_file[key] for key in cache_file.files
+                if key not in ("Date", COVERED_START_KEY, UPDATE_DATE_KEY)
+            },
+            np.asarray(cache_file["Date"], dtype='datetime64[D]')
+        )
+        return PriceCacheEntryType(
+            data,
+            covered_start=str(cache_file[COVERED_START_KEY]),
+            update_date=str(cache_file[UPDATE_DATE_KEY])
+        )
+
+
+def store_price_cache(ticker: str,
+                      interval: str,
+                      entry: PriceCacheEntryType,
+                      cache_dir: Union[str, None] = None):
+    """store_price_cache
+
+    Write (or overwrite) the cache file of a ticker. Also the way to seed the cache, e.g. for
+    offline runs.
+
+    Args:
+        ticker (str): ticker symbol
+        interval (str): yfinance interval
+        entry (PriceCacheEntryType): history to store
+        cache_dir (Union[str, None], optional): cache directory. Defaults to PRICE_CACHE_PATH.
+    """
+    path = get_price_cache_path(ticker, interval, cache_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    columns = {key: np.asarray(values, dtype=float) for key, values in entry.data.items()}
+    columns["Date"] = np.asarray(entry.data.dates, dtype='datetime64[D]')
+    columns[COVERED_START_KEY] = np.array(entry.covered_start)
+    columns[UPDATE_DATE_KEY] = np.array(entry.update_date)
+
+    # Write to a temporary file first so an interrupted run can't leave a broken cache file
+    temp_path = f"{path}.tmp.npz"
+    np.savez(temp_path, **columns)
+    os.replace(temp_path, path)
+
+
+def is_cache_stale(entry: PriceCacheEntryType,
+                   now: Union[datetime.datetime, None] = None,
+                   ttl: datetime.timedelta = PRICE_CACHE_TTL) -> bool:
+    """is_cache_stale
+
+    Args:
+        entry (PriceCacheEntryType): cached history (with at least a bar)
+        now (Union[datetime.datetime, None], optional): current time. Defaults to now.
+        ttl (datetime.timedelta, optional): max age of the cached history. Defaults to
+            PRICE_CACHE_TTL.
+
+    Returns:
+        bool: True if the cached history needs a refresh: its last bar is today's (it may have
+            been cached while still forming), or it was downloaded more than ttl ago
+    """
+    now = now or datetime.datetime.now()
+    if entry.data.dates[-1] >= np.datetime64(now.date(), 'D'):
+        return True
+    try:
+        # Update times of older caches are dates (midnight)
+        update_time = datetime.datetime.fromisoformat(entry.update_date)
+    except ValueError:
+        return True
+    return now - update_time >= ttl
+
+
+def merge_ticker_data(cached_data: TickerDataType, new_data: TickerDataType) -> TickerDataType:
+    """merge_ticker_data
+
+    Append newly downloaded bars to the cached ones. Cached bars on or after the first new date
+    are replaced (e.g. the last, still-forming bar of a previous run).
+
+    Args:
+        cached_data (TickerDataType): cached history
+        new_data (TickerDataType): newly downloaded history
+
+    Returns:
+        TickerDataType: merged history
+    """
+    if len(new_data.dates) == 0:
+        return cached_data
+
+    cut = int(np.searchsorted(cached_data.dates, new_data.dates[0]))
+    return TickerDataType(
+        {
+            key: np.concatenate((values[0:cut], new_data[key]))
+            for key, values in cached_data.items() if key in new_data
+        },
+        np.concatenate((cached_data.dates[0:cut], new_data.dates))
+    )
+
+
+def is_overlap_consistent(cached_data: TickerDataType,
+                          new_data: TickerDataType,
+                          tolerance: float = ADJUSTMENT_TOLERANCE) -> bool:
+    """is_overlap_consistent
+
+    Check the first newly downloaded bar against the cached bar of the same date. After a split or
+    dividend, yfinance re-adjusts the whole history, so cached bars would no longer line up with
+    new ones (an artificial step in the merged history).
+
+    Args:
+        cached_data (TickerDataType): cached history
+        new_data (TickerDataType): newly downloaded history, starting on a cached (completed) bar
+        tolerance (float, optional): max relative difference. Defaults to ADJUSTMENT_TOLERANCE.
+
+    Returns:
+        bool: True if the new bars can be merged onto the cached ones (or there are none)
+    """
+    if len(new_data.dates) == 0:
+        return True
+
+    cached_index = int(np.searchsorted(cached_data.dates, new_data.dates[0]))
+    if cached_index == len(cached_data.dates) or \
+            cached_data.dates[cached_index] != new_data.dates[0]:
+        # No overlapping bar to check against
+        return False
+
+    for key in ADJUSTED_COLUMNS:
+        if key in cached_data and key in new_data and not np.isclose(
+                new_data[key][0], cached_data[key][cached_index], rtol=tolerance, atol=0.0):
+            return False
+    return True
+
+
+def trim_ticker_data(data: TickerDataType, start_date: Union[str, None]) -> TickerDataType:
+    """trim_ticker_data
+
+    Args:
+        data (TickerDataType): history
+        start_date (Union[str, None]): first date to keep (None keeps everything)
+
+    Returns:
+        TickerDataType: history from start_date on (views of data's arrays)
+    """
+    if not start_date:
+        return data
+    start = int(np.searchsorted(data.dates, np.datetime64(start_date, 'D')))
+    return TickerDataType(
+        {key: values[start:] for key, values in data.items()}, data.dates[start:])
@@ -0,0 +1,131 @@
+""" price_store.py
+
+Memory-mapped, columnar price store for large universes. Each field ('Open', 'Close', ...) is one
+.npy file of shape (tickers, dates), aligned on a common date index, with a JSON ticker index. A
+ticker is read as zero-copy views of the memory-mapped files, so any number of worker processes
+share the one page-cached copy of the data.
+"""
+import os
+import json
+from typing import Dict, List, Union
+
+import numpy as np
+
+from .lib_types import TickerDataType
+
+
+PRICE_STORE_INDEX_FILE = "index.json"
+PRICE_STORE_DATES_FILE = "dates.npy"
+
+
+def write_price_store(path: str, data: Dict[str, TickerDataType]):
+    """write_price_store
+
+    Write (or overwrite) a price store. Fields are filled ticker by ticker, straight into the
+    memory-mapped files, so the full (tickers, dates) arrays never need to be in memory.
+
+    Args:
+        path (str): directory of the store
+        data (Dict[str, TickerDataType]): history per ticker, e.g. from a PriceDataProvider
+    """
+    # pylint: disable=too-many-locals
+    os.makedirs(path, exist_ok=True)
+    tickers = [ticker for ticker, ticker_data in data.items() if len(ticker_data.dates) > 0]
+    fields = list(dict.fromkeys(field for ticker in tickers for field in data[ticker]))
+    dates = np.unique(np.concatenate([data[ticker].dates for ticker in tickers])) \
+        if tickers else np.empty(0, dtype='datetime64[D]')
+    np.save(os.path.join(path, PRICE_STORE_DATES_FILE), dates.astype('datetime64[D]'))
+
+    ranges = {}
+    has_gaps = {}
+    positions = {}
+    for ticker in tickers:
+        positions[ticker] = np.searchsorted(dates, data[ticker].dates)
+        ranges[ticker] = [int(positions[ticker][0]), int(positions[ticker][-1]) + 1]
+        has_gaps[ticker] = ranges[ticker][1] - ranges[ticker][0] != len(positions[ticker])
+
+    for field in fields:
+        field_file = np.lib.format.open_memmap(
+            _get_field_path(path, field), mode='w+', dtype=float, shape=(len(tickers), len(dates)))
+        field_file[:] = np.nan
+        for row, ticker in enumerate(tickers):
+            if field in data[ticker]:
+                field_file[row, positions[ticker]] = data[ticker][field]
+        field_file.flush()
+        del field_file
+
+    index = {
+        "tickers": tickers,
+        "fields": {ticker: list(data[ticker]) for ticker in tickers},
+        "ranges": ranges,
+        "has_gaps": has_gaps
+    }
+    with open(os.path.join(path, PRICE_STORE_INDEX_FILE), 'w', encoding='utf-8') as index_file:
+        json.dump(index, index_file)
+
+
+def _get_field_path(path: str, field: str) -> str:
+    return os.path.join(path, f"{field}.npy")
+
+
+class PriceStore:
+    """ Read side of a price store written by write_price_store. Pickles as its path, so a store
+    handed to worker processes is re-opened (memory-mapped) there rather than copied. """
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, PRICE_STORE_INDEX_FILE), 'r', encoding='utf-8') as index_file:
+            index = json.load(index_file)
+        self.tickers: List[str] = index["tickers"]
+        self.ticker_fields: Dict[str, List[str]] = index["fields"]
+        self.ranges: Dict[str, List[int]] = index["ranges"]
+        self.has_gaps: Dict[str, bool] = index["has_gaps"]
+        self.rows = {ticker: row for row, ticker in enumerate(self.tickers)}
+        self.dates = np.load(os.path.join(path, PRICE_STORE_DATES_FILE), mmap_mode='r')
+        self._fields: Dict[str, np.ndarray] = {}
+
+    def __reduce__(self):
+        return (self.__class__, (self.path,))
+
+    def __contains__(self, ticker: str) -> bool:
+        return ticker in self.rows
+
+    def get_field(self, field: str) -> np.ndarray:
+        """get_field
+
+        Args:
+            field (str): e.g. 'Close'
+
+        Returns:
+            np.ndarray: memory-mapped (tickers, dates) array of the field (NaN where no data)
+        """
+        if field not in self._fields:
+            self._fields[field] = np.load(_get_field_path(self.path, field), mmap_mode='r')
+        return self._fields[field]
+
+    def get_ticker_data(self, ticker: str) -> Union[TickerDataType, None]:
+        """get_ticker_data
+
+        Args:
+            ticker (str): ticker symbol
+
+        Returns:
+            Union[TickerDataType, None]: history of the ticker, as views of the memory-mapped
+                files (or, for a ticker missing some dates within its range, a compacted copy);
+                None if the ticker isn't in the store
+        """
+        if ticker not in self.rows:
+            return None
+
+        row = self.rows[ticker]
+        start, end = self.ranges[ticker]
+        columns = {field: self.get_field(field)[row, start:end]
+                   for field in self.ticker_fields[ticker]}
+        dates = self.dates[start:end]
+
+        if self.has_gaps[ticker]:
+            has_data = ~np.all(np.isnan(np.array(list(columns.values()))), axis=0)
+            columns = {field: values[has_data] for field, values in columns.items()}
+            dates = dates[has_data]
+        return TickerDataType(columns, dates)
@@ -0,0 +1,259 @@
+""" providers.py
+
+Price data providers: where IntelliStop gets its price history from (yfinance, a local directory of
+CSV / Parquet files, a memory-mapped price store, in-memory arrays, or a synthetic generator). All
+of them return data in the format of format_data, so the analysis doesn't depend on the source.
+"""
+import abc
+import os
+import zlib
+import datetime
+from typing import List, Union, Callable
+
+import numpy as np
+import pandas as pd
+
+from .api import download_data_batch, format_data
+from .async_api import download_data_concurrent
+from .lib_types import ConfigProperties, TickerDataType
+from .price_cache import get_period_start_date
+from .price_store import PriceStore
+
+
+class PriceDataProvider(abc.ABC):
+    """ Base price data provider: subclasses supply the history of one ticker at a time """
+    # Remote (network) providers are best called once for all funds, rather than per process
+    is_remote: bool = False
+
+    def get_data(self, funds: List[str], config: ConfigProperties) -> dict:
+        """get_data
+
+        Args:
+            funds (List[str]): ticker symbols (e.g. ["SPY", "VTSAX"])
+            config (ConfigProperties): period, date, and benchmark properties
+
+        Returns:
+            dict: formatted data in a dictionary: data['fund_name'] = {'Close': [], 'Date': [], ...}
+        """
+        tickers = list(dict.fromkeys(funds))
+        if config.yf_properties.include_bench and "^GSPC" not in tickers:
+            tickers.append("^GSPC")
+        return {ticker: self.get_ticker_data(ticker, config) for ticker in tickers}
+
+    @abc.abstractmethod
+    def get_ticker_data(self, ticker: str, config: ConfigProperties) -> TickerDataType:
+        """ History of a single ticker (no 'Close' data if the ticker isn't available) """
+
+
+def select_window(data: TickerDataType, config: ConfigProperties) -> TickerDataType:
+    """select_window
+
+    Cut a longer history down to the config's dates (start / end date, or else the period that
+    ends today), the same window yfinance would have downloaded
+
+    Args:
+        data (TickerDataType): history of a ticker
+        config (ConfigProperties): period and date properties
+
+    Returns:
+        TickerDataType: history within the window (views of data's arrays)
+    """
+    start_date = config.yf_properties.start_date or \
+        get_period_start_date(config.yf_properties.period)
+    start = 0
+    end = len(data.dates)
+    if start_date:
+        start = int(np.searchsorted(data.dates, np.datetime64(start_date, 'D')))
+    if config.yf_properties.end_date:
+        # End date is exclusive, as for yfinance
+        end = int(np.searchsorted(data.dates, np.datetime64(config.yf_properties.end_date, 'D')))
+    if start == 0 and end == len(data.dates):
+        return data
+    return TickerDataType(
+        {key: values[start:end] for key, values in data.items()}, data.dates[start:end])
+
+
+def _get_missing_ticker_data() -> TickerDataType:
+    return TickerDataType({"Close": np.empty(0)})
+
+
+class YFinanceProvider(PriceDataProvider):
+    """ Downloads from yfinance (all funds in one request, through the price cache if enabled) """
+    is_remote = True
+
+    def __init__(self, fetch_function: Union[Callable, None] = None):
+        # fetch_function: optional stand-in for yf.download
+        self.fetch_function = fetch_function
+
+    def get_data(self, funds: List[str], config: ConfigProperties) -> dict:
+        return download_data_batch(funds, config, fetch_function=self.fetch_function)
+
+    def get_ticker_data(self, ticker: str, config: ConfigProperties) -> TickerDataType:
+        return self.get_data([ticker], config)[ticker]
+
+
+class ConcurrentYFinanceProvider(PriceDataProvider):
+    """ Downloads from yfinance with a request per ticker, run concurrently (see
+    download_data_async). A ticker that fails comes back without data; the errors of the latest
+    get_data are kept in 'errors'. """
+    is_remote = True
+
+    def __init__(self, fetch_function: Union[Callable, None] = None, **download_args):
+        # download_args: max_concurrency, max_retries, backoff, min_interval
+        self.fetch_function = fetch_function
+        self.download_args = download_args
+        self.errors = {}
+
+    def get_data(self, funds: List[str], config: ConfigProperties) -> dict:
+        data, self.errors = download_data_concurrent(
+            funds, config, fetch_function=self.fetch_function, **self.download_args)
+        for ticker in self.errors:
+            data[ticker] = _get_missing_ticker_data()
+        return data
+
+    def get_ticker_data(self, ticker: str, config: ConfigProperties) -> TickerDataType:
+        return self.get_data([ticker], config)[ticker]
+
+
+class DirectoryProvider(PriceDataProvider):
+    """ Reads a local directory with a file per ticker (e.g. 'SPY.csv' or 'SPY.parquet'), with a
+    'Date' column (or index) and the price columns ('Open', 'High', 'Low', 'Close', ...) """
+
+    def __init__(self, path: str, file_format: str = "csv"):
+        self.path = path
+        self.file_format = file_format
+
+    def get_ticker_data(self, ticker: str, config: ConfigProperties) -> TickerDataType:
+        file_path = os.path.join(self.path, f"{ticker}.{self.file_format}")
+        if not os.path.exists(file_path):
+            return _get_missing_ticker_data()
+
+        if self.file_format == "parquet":
+            # Needs a parquet engine (pyarrow or fastparquet)
+            frame = pd.read_parquet(file_path)
+        else:
+            frame = pd.read_csv(file_path)
+        if "Date" in frame.columns:
+            frame = frame.set_index("Date")
+        frame.index = pd.to_datetime(frame.index)
+        return select_window(format_data(frame.sort_index(), ticker)[ticker], config)
+
+
+class InMemoryProvider(PriceDataProvider):
+    """ Serves price data already in memory, as given (no date window is applied). Per ticker,
+    either a DataFrame (as from yfinance), a TickerDataType, or a dict of columns with 'Date' """
+
+    def __init__(self, data: dict):
+        self.data = {}
+        for ticker, ticker_data in data.items():
+            if isinstance(ticker_data, pd.DataFrame):
+                self.data[ticker] = format_data(ticker_data, ticker)[ticker]
+            elif isinstance(ticker_data, TickerDataType):
+                self.data[ticker] = ticker_data
+            else:
+                self.data[ticker] = TickerDataType(
+                    {
+                        key: np.asarray(values, dtype=float)
+                        for key, values in ticker_data.items() if key != "Date"
+                    },
+                    np.asarray(ticker_data.get("Date", []), dtype='datetime64[D]')
+                )
+
+    def get_ticker_data(self, ticker: str, config: ConfigProperties) -> TickerDataType:
+        return self.data.get(ticker, _get_missing_ticker_data())
+
+
+class SyntheticProvider(PriceDataProvider):
+    """ Generates random-walk (geometric Brownian motion) price histories on business days. Each
+    ticker gets its own, repeatable history for a given seed. """
+    # pylint: disable=too-many-arguments
+
+    def __init__(self,
+                 seed: int = 0,
+                 volatility: float = 0.012,
+                 drift: float = 0.0003,
+                 num_years: int = 20,
+                 end_date: Union[str, None] = None):
+        self.seed = seed
+        self.volatility = volatility
+        self.drift = drift
+        self.num_years = num_years
+        self.end_date = end_date
+
+    def get_ticker_data(self, ticker: str, config: ConfigProperties) -> TickerDataType:
+        end = np.datetime64(self.end_date or datetime.date.today(), 'D')
+        dates = np.arange(end - 365 * self.num_years, end + 1)
+        dates = dates[np.is_busday(dates)]
+
+        rng = np.random.default_rng([self.seed, zlib.crc32(ticker.encode())])
+        returns = rng.normal(self.drift, self.volatility, len(dates))
+        close = 100.0 * np.exp(np.cumsum(returns))
+        open_price = np.concatenate(([100.0], close[:-1])) * \
+            (1.0 + rng.normal(0.0, self.volatility / 4.0, len(dates)))
+        spread = np.abs(rng.normal(0.0, self.volatility / 2.0, len(dates)))
+
+        data = TickerDataType(
+            {
+                "Open": open_price,
+                "High": np.maximum(open_price, close) * (1.0 + spread),
+                "Low": np.minimum(open_price, close) * (1.0 - spread),
+                "Close": close,
+                "Adj Close": close,
+                "Volume": rng.integers(100_000, 10_000_000, len(dates)).astype(float)
+            },
+            dates
+        )
+        return select_window(data, config)
+
+
+class PriceStoreProvider(PriceDataProvider):
+    """ Reads a memory-mapped price store (see write_price_store): each ticker's data is a set of
+    zero-copy views of the store's files """
+
+    def __init__(self, path: str):
+        self.store = PriceStore(path)
+
+    def get_ticker_data(self, ticker: str, config: ConfigProperties) -> TickerDataType:
+        data = self.store.get_ticker_data(ticker)
+        if data is None:
+            return _get_missing_ticker_data()
+        return select_window(data, config)
+
+
+DATA_PROVIDERS = {
+    "yfinance": YFinanceProvider,
+    "yfinance_async": ConcurrentYFinanceProvider,
+    "directory": DirectoryProvider,
+    "store": PriceStoreProvider,
+    "memory": InMemoryProvider,
+    "synthetic": SyntheticProvider
+}
+
+
+def get_data_provider(config: ConfigProperties,
+                      fetch_function: Union[Callable, None] = None) -> PriceDataProvider:
+    """get_data_provider
+
+    Provider selected by the config: 'data_provider' is either a PriceDataProvider object or a
+    name from DATA_PROVIDERS, built with the keyword arguments of 'data_provider_args'
+
+    Args:
+        config (ConfigProperties): config with the data provider properties
+        fetch_function (Union[Callable, None], optional): stand-in for yf.download, for the
+            yfinance providers. Defaults to None.
+
+    Returns:
+        PriceDataProvider: data provider
+    """
+    if isinstance(config.data_provider, PriceDataProvider):
+        return config.data_provider
+
+    if config.data_provider not in DATA_PROVIDERS:
+        raise ValueError(
+            f"Unknown data provider '{config.data_provider}', expected one of "
+            f"{list(DATA_PROVIDERS)} or a PriceDataProvider object")
+
+    provider_args = dict(config.data_provider_args)
+    if config.data_provider in ("yfinance", "yfinance_async") and fetch_function:
+        provider_args.setdefault("fetch_function", fetch_function)
+    return DATA_PROVIDERS[config.data_provider](**provider_args)
@@ -31,13 +31,15 @@ class StorageKeysEnum(Enum):
 
 class Storage:
     """ Storage class for storing historical data """
-    stored_data: dict = {
-        StorageKeysTopEnum.TICKERS.value: {},
-        StorageKeysTopEnum.VERSION.value: "1",
-        StorageKeysTopEnum.UPDATE_DATE.value: datetime.datetime.now().isoformat()
-    }
+    stored_data: dict
 
     def __init__(self):
+        # Per-instance data, so instances without a storage file don't share one dict
+        self.stored_data = {
+            StorageKeysTopEnum.TICKERS.value: {},
+            StorageKeysTopEnum.VERSION.value: "1",
+            StorageKeysTopEnum.UPDATE_DATE.value: datetime.datetime.now().isoformat()
+        }
         temp_path = os.path.join(os.getcwd(), STORAGE_DIR_NAME)
         if not os.path.exists(temp_path):
             os.mkdir(temp_path)
@@ -1,11 +1,14 @@
 """ variances.py """
-from typing import Tuple, Union
+from typing import List, Tuple, Union
 
 import numpy as np
 
 
-def calculate_time_series_variances(data_set: list,
-                                    overrides: Union[dict, None] = None) -> Tuple[list, int]:
+NON_DERIVED_WINDOW = 50
+
+
+def calculate_time_series_variances(data_set: Union[list, np.ndarray],
+                                    overrides: Union[dict, None] = None) -> Tuple[np.ndarray, int]:
     """calculate_time_series variances
 
     Essentially, find a moving variance across the data_set. This is critical to see how a data set
@@ -16,36 +19,292 @@ def calculate_time_series_variances(data_set: list,
     data set.
 
     Args:
-        data_set (list): data for which to find the variances
+        data_set (Union[list, np.ndarray]): data for which to find the variances
         overrides (Union[dict, None], optional): set of params, such as 'window' and 'use_derived'
             to override defaults. Defaults to None.
 
     Returns:
-        Tuple[list, int]: variances over time, window used in calculation
+        Tuple[np.ndarray, int]: variances over time, window used in calculation
     """
     if not overrides:
         overrides = {}
 
-    ts_var = [0.0] * len(data_set)
+    data_set = np.asarray(data_set, dtype=float)
     window = overrides.get('window', int(max(len(data_set) / 10.0, 50)))
     use_derived = overrides.get('use_derived', False)
 
     if not use_derived:
-        window = 50
+        window = NON_DERIVED_WINDOW
     mode = overrides.get('mode', 'var')
 
+    ts_var = np.zeros(len(data_set))
     if mode == 'var':
-        first_var = np.var(data_set[0:window])
-        for i in range(window):
-            ts_var[i] = first_var
-        for i in range(window, len(data_set)):
-            ts_var[i] = np.var(data_set[i-window+1:i])
+        ts_var = rolling_variance(data_set, window)
 
     elif mode == 'std':
-        first_var = np.std(data_set[0:window])
-        for i in range(window):
-            ts_var[i] = first_var
-        for i in range(window, len(data_set)):
-            ts_var[i] = np.std(data_set[i-window+1:i])
+        ts_var = np.sqrt(rolling_variance(data_set, window))
 
     return ts_var, window
+
+
+def _get_block_running_sums(data_set: np.ndarray,
+                            block_size: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """_get_block_running_sums
+
+    Running sums of x and x^2 that restart at the start of every block of 'block_size' points,
+    with each block centered on its own mean. With blocks about a window long, the sums stay on
+    the scale of the data's local spread rather than its level (or trend), so the differences
+    taken from them don't lose precision to cancellation.
+
+    Args:
+        data_set (np.ndarray): data to sum
+        block_size (int): number of points per block
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: block means, shape (num_blocks,), and running
+            sums of the centered data, shape (num_blocks, block_size + 1) each
+    """
+    num_blocks = -(-len(data_set) // block_size)
+    # Padding repeats the last point, so it doesn't pull the last block's center away from the data
+    padded = np.pad(data_set, (0, num_blocks * block_size - len(data_set)), mode='edge')
+    padded = padded.reshape(num_blocks, block_size)
+    block_means = np.mean(padded, axis=1)
+    padded = padded - block_means[:, np.newaxis]
+
+    running_sum = np.zeros((num_blocks, block_size + 1))
+    running_sq_sum = np.zeros((num_blocks, block_size + 1))
+    np.cumsum(padded, axis=1, out=running_sum[:, 1:])
+    np.cumsum(padded * padded, axis=1, out=running_sq_sum[:, 1:])
+    return block_means, running_sum, running_sq_sum
+
+
+def rolling_variance(data_set: np.ndarray, window: int) -> np.ndarray:
+    """rolling_variance
+
+    O(n) moving (population) variance of a single window size. See rolling_variances.
+
+    Args:
+        data_set (np.ndarray): data for which to find the variances
+        window (int): variance window size
+
+    Returns:
+        np.ndarray: variances over time
+    """
+    return rolling_variances(data_set, [window])[0]
+
+
+def rolling_variances(data_set: np.ndarray, windows: List[int]) -> np.ndarray:
+    """rolling_variances
+
+    O(n) moving (population) variances from running sums of x and x^2. The data is split into
+    blocks of (window - 1) points, each centered on its own mean, so a window spans at most two
+    blocks: each part's mean and sum of squared deviations come from its block's running sums, and
+    the two parts are combined with the pairwise (Chan et al.) update. No term subtracts a large
+    level or trend, so trending prices keep the precision of a direct np.var of each slice.
+
+    Window semantics match the original sliced implementation: the first 'window' points all hold
+    the variance of data_set[0:window], and every later point i holds the variance of
+    data_set[i-window+1:i] (i.e. window - 1 points, excluding i itself).
+
+    Args:
+        data_set (np.ndarray): data for which to find the variances
+        windows (List[int]): variance window sizes
+
+    Returns:
+        np.ndarray: variances over time, shape (len(windows), len(data_set))
+    """
+    # pylint: disable=too-many-locals
+    data_set = np.asarray(data_set, dtype=float)
+    ts_vars = np.zeros((len(windows), len(data_set)))
+    if len(data_set) == 0 or len(windows) == 0:
+        return ts_vars
+
+    for ts_var, window in zip(ts_vars, windows):
+        ts_var[0:window] = np.var(data_set[0:window])
+        if len(data_set) <= window:
+            continue
+
+        num_points = window - 1
+        if num_points < 2:
+            # Single point (zero variance) or empty (undefined) slices
+            ts_var[window:] = 0.0 if num_points == 1 else np.nan
+            continue
+
+        block_means, running_sum, running_sq_sum = _get_block_running_sums(data_set, num_points)
+
+        # Slice [i-window+1:i] for i in [window, n): its first point (lower) and its last point
+        # (upper - 1) as (block, offset); offsets are of the running sums (exclusive ends)
+        upper = np.arange(window, len(data_set))
+        lower = upper - num_points
+        lower_block, lower_offset = np.divmod(lower, num_points)
+        upper_block, upper_offset = np.divmod(upper - 1, num_points)
+        upper_offset += 1
+        same_block = upper_block == lower_block
+
+        # Part in the lower block, and the rest (if any) at the start of the upper block
+        lower_end = np.where(same_block, upper_offset, num_points)
+        lower_count = lower_end - lower_offset
+        lower_sum = running_sum[lower_block, lower_end] - running_sum[lower_block, lower_offset]
+        lower_mean = lower_sum / lower_count
+        lower_sq_dev = running_sq_sum[lower_block, lower_end] \
+            - running_sq_sum[lower_block, lower_offset] - lower_sum * lower_mean
+
+        upper_count = np.where(same_block, 0, upper_offset)
+        upper_sum = np.where(same_block, 0.0, running_sum[upper_block, upper_offset])
+        upper_mean = upper_sum / np.maximum(upper_count, 1)
+        upper_sq_dev = np.where(same_block, 0.0, running_sq_sum[upper_block, upper_offset]) \
+            - upper_sum * upper_mean
+
+        mean_delta = (block_means[upper_block] + upper_mean) \
+            - (block_means[lower_block] + lower_mean)
+        sq_dev = np.maximum(lower_sq_dev, 0.0) + np.maximum(upper_sq_dev, 0.0) \
+            + mean_delta * mean_delta * lower_count * upper_count / num_points
+        ts_var[window:] = sq_dev / num_points
+
+    return ts_vars
+
+
+class RollingStdAccumulator:
+    """ Rolling Std Accumulator
+
+    Streaming counterpart of calculate_time_series_variances (mode 'std', same window semantics)
+    for detrended data (price minus its SMA). Alongside the rolling std, it keeps the running means
+    of that std over the points above (> 0) and below (< 0) the SMA, as used for the VF. Each
+    update is O(1); the last 'window - 1' points are kept in a ring buffer with running sums.
+    """
+    # pylint: disable=too-many-instance-attributes
+    window: int
+    count: int
+    current_std: float
+
+    def __init__(self, window: int):
+        self.window = window
+        self.count = 0
+        self.current_std = np.nan
+        self.first_values = np.zeros(window)
+        self.history = np.zeros(max(window - 1, 0))
+        self.position = 0
+        self.running_sum = 0.0
+        self.running_sq_sum = 0.0
+        self.above_sum = 0.0
+        self.above_count = 0
+        self.below_sum = 0.0
+        self.below_count = 0
+
+    @property
+    def above_mean(self) -> float:
+        """ mean of the rolling std over the points above the SMA """
+        return self.above_sum / self.above_count if self.above_count > 0 else np.nan
+
+    @property
+    def below_mean(self) -> float:
+        """ mean of the rolling std over the points below the SMA """
+        return self.below_sum / self.below_count if self.below_count > 0 else np.nan
+
+    def _add_to_means(self, std: float, values: np.ndarray):
+        num_above = int(np.count_nonzero(values > 0.0))
+        num_below = int(np.count_nonzero(values < 0.0))
+        self.above_sum += std * num_above
+        self.above_count += num_above
+        self.below_sum += std * num_below
+        self.below_count += num_below
+
+    def _sync_running_sums(self):
+        """ Recompute the running sums from the ring buffer """
+        self.running_sum = float(np.sum(self.history))
+        self.running_sq_sum = float(np.sum(self.history * self.history))
+
+    def _get_history_std(self) -> float:
+        num_points = len(self.history)
+        if num_points < 2:
+            # Single point (zero variance) or empty (undefined) slices
+            return 0.0 if num_points == 1 else np.nan
+        mean = self.running_sum / num_points
+        return float(np.sqrt(max(self.running_sq_sum / num_points - mean * mean, 0.0)))
+
+    def update(self, value: float) -> float:
+        """update
+
+        Feed the next detrended point
+
+        Args:
+            value (float): price minus SMA of the new point
+
+        Returns:
+            float: rolling std of the new point (nan until the first window is complete, at which
+                point the first window's std applies to all of its points)
+        """
+        index = self.count
+        self.count += 1
+        if index < self.window:
+            self.first_values[index] = value
+            if index < self.window - 1:
+                return np.nan
+            self.current_std = float(np.std(self.first_values))
+            self._add_to_means(self.current_std, self.first_values)
+            self.history[:] = self.first_values[1:]
+            self._sync_running_sums()
+            return self.current_std
+
+        # The point's own window excludes itself: the previous 'window - 1' points
+        self.current_std = self._get_history_std()
+        self._add_to_means(self.current_std, np.array([value]))
+
+        if len(self.history) > 0:
+            oldest = self.history[self.position]
+            self.history[self.position] = value
+            self.position = (self.position + 1) % len(self.history)
+            self.running_sum += value - oldest
+            self.running_sq_sum += value * value - oldest * oldest
+            if self.position == 0:
+                # Re-sync so rounding error of the running sums can't build up on long feeds
+                self._sync_running_sums()
+        return self.current_std
+
+    @classmethod
+    def from_data_set(cls, data_set: np.ndarray, window: int) -> 'RollingStdAccumulator':
+        """from_data_set
+
+        Seed an accumulator with a full history in one vectorized pass
+
+        Args:
+            data_set (np.ndarray): detrended data (price minus SMA)
+            window (int): variance window size
+
+        Returns:
+            RollingStdAccumulator: accumulator, as if every point had been fed with update
+        """
+        data_set = np.asarray(data_set, dtype=float)
+        accumulator = cls(window)
+        if len(data_set) < window or window < 1:
+            for value in data_set:
+                accumulator.update(value)
+            return accumulator
+
+        ts_std = np.sqrt(rolling_variance(data_set, window))
+        above = data_set > 0.0
+        below = data_set < 0.0
+        accumulator.count = len(data_set)
+        accumulator.current_std = float(ts_std[-1])
+        accumulator.first_values[:] = data_set[0:window]
+        accumulator.above_sum = float(np.sum(ts_std[above]))
+        accumulator.above_count = int(np.count_nonzero(above))
+        accumulator.below_sum = float(np.sum(ts_std[below]))
+        accumulator.below_count = int(np.count_nonzero(below))
+        accumulator.history[:] = data_set[len(data_set) - len(accumulator.history):]
+        accumulator._sync_running_sums()
+        return accumulator
+
+    def to_dict(self) -> dict:
+        """ JSON-compatible dictionary of the accumulator state """
+        return {key: value.tolist() if isinstance(value, np.ndarray) else value
+                for key, value in vars(self).items()}
+
+    @classmethod
+    def from_dict(cls, state: dict) -> 'RollingStdAccumulator':
+        """ Rebuild the accumulator from a dictionary made by to_dict """
+        accumulator = cls.__new__(cls)
+        for key, value in state.items():
+            setattr(accumulator, key,
+                    np.array(value, dtype=float) if isinstance(value, list) else value)
+        return accumulator
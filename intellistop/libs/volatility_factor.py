@@ -4,15 +4,19 @@ Main "magic" of this tool. Ultimately, the VF is the key. If a price drops below
 current max, it is considered to be in a major downward trend, and it should be sold until it
 hits its re-entry signal.
 """
-from typing import Tuple, List
+from typing import Tuple, List, Union
 import numpy as np
 
 from .lib_types import (
-    StopLossEventLogType, StopLossEventType, VFTimeSeriesType, VFStopLossResultType
+    StopLossEventLogType, StopLossEventType, VFTimeSeriesType, VFStopLossResultType,
+    VFSweepResultType, VFLockStepResultType
 )
+from .filters import SimpleMovingAverageStream
+from .variances import RollingStdAccumulator, NON_DERIVED_WINDOW
 
 
 ERROR_ZONE_THRESHOLD_MAX = 0.02
+SEARCH_CHUNK_MIN_SIZE = 64
 
 
 def get_stop_loss_from_value(max_price: float,
@@ -79,6 +83,459 @@ def get_current_stop_loss_values(current_vfs: VFStopLossResultType,
     return current_sl
 
 
+def _get_search_chunks(start: int, end: int, chunk_size: int = SEARCH_CHUNK_MIN_SIZE):
+    """ Yield [low, high) chunks from start to end, doubling in size, so that finding a transition
+    costs about as much as the segment it ends rather than the rest of the data set """
+    low = start
+    chunk_size = max(chunk_size, SEARCH_CHUNK_MIN_SIZE)
+    while low < end:
+        high = min(low + chunk_size, end)
+        yield low, high
+        low = high
+        chunk_size *= 2
+
+
+def _get_next_true_indexes(mask: np.ndarray) -> np.ndarray:
+    """ For each index (and len(mask)), the first index at or after it where mask is True, or
+    len(mask) if there's none """
+    indexes = np.append(np.where(mask, np.arange(len(mask)), len(mask)), len(mask))
+    return np.minimum.accumulate(indexes[::-1])[::-1]
+
+
+# pylint: disable=too-many-arguments
+def _find_stop_index(data: np.ndarray,
+                     start: int,
+                     volatility_factor: float,
+                     min_vf: float,
+                     running_max: np.ndarray,
+                     chunk_size: int = SEARCH_CHUNK_MIN_SIZE) -> Tuple[int, int]:
+    """_find_stop_index
+
+    Within an active segment that starts (at its max) on 'start', the stop loss line is simply the
+    running max times a constant factor. A bar below the stop loss (beyond the "measurement error
+    zone") counts as a strike, a bar at or above the stop loss clears all strikes, and bars within
+    the error zone do neither. The segment is stopped out on the 2nd strike.
+
+    Args:
+        data (np.ndarray): [Close or Adjusted] price
+        start (int): index where the active segment starts
+        volatility_factor (float): VF of the fund
+        min_vf (float): historical (conservative) VF of the fund
+        running_max (np.ndarray): [modified] buffer the running max of the segment is written to
+        chunk_size (int, optional): size of the first search chunk (e.g. the length of the
+            previous segment). Defaults to SEARCH_CHUNK_MIN_SIZE.
+
+    Returns:
+        Tuple[int, int]: stop index (-1 if never stopped out), number of strikes standing at the
+            end of the data (if never stopped out)
+    """
+    # pylint: disable=too-many-locals
+    error_zone = ERROR_ZONE_THRESHOLD_MAX * (min_vf / 50.0)
+    current_max = data[start]
+    num_strikes_carried = 0
+
+    # The start bar is its own max, so it's always a clear (with no strikes standing yet)
+    for low, high in _get_search_chunks(start, len(data), chunk_size):
+        chunk = data[low:high]
+        chunk_max = running_max[low:high]
+        np.maximum.accumulate(chunk, out=chunk_max)
+        if low > start:
+            np.maximum(chunk_max, current_max, out=chunk_max)
+        current_max = chunk_max[-1]
+        stop_loss_line = chunk_max * (1.0 - (volatility_factor / 100.0))
+
+        # argmax of a boolean array: the first True (or 0, if there's none)
+        strikes = chunk < stop_loss_line * (1.0 - error_zone)
+        if not strikes[strikes.argmax()]:
+            # Without strikes, only a clear changes the strikes standing
+            if num_strikes_carried > 0 and np.logical_or.reduce(chunk >= stop_loss_line):
+                num_strikes_carried = 0
+            continue
+
+        # Strikes stand until the next clear: the segment stops on the first strike with another
+        # strike (or a strike carried into the chunk) since the last clear
+        num_clears = (chunk >= stop_loss_line).cumsum()
+        strike_indexes = strikes.nonzero()[0]
+        strike_clears = num_clears[strike_indexes]
+        if num_strikes_carried > 0 and strike_clears[0] == 0:
+            return low + int(strike_indexes[0]), 0
+        second_strikes = (strike_clears[1:] == strike_clears[:-1]).nonzero()[0]
+        if len(second_strikes) > 0:
+            return low + int(strike_indexes[second_strikes[0] + 1]), 0
+        num_strikes_carried = int(strike_clears[-1] == num_clears[-1])
+
+    return -1, num_strikes_carried
+
+
+def _find_rebound_index(data: np.ndarray,
+                        start: int,
+                        current_min: float,
+                        volatility_factor: float,
+                        chunk_size: int = SEARCH_CHUNK_MIN_SIZE) -> int:
+    """ First index (from start on) where the price is 1 VF above the minimum tracked so far, or
+    len(data) if there's none """
+    for low, high in _get_search_chunks(start, len(data), chunk_size):
+        running_min = np.minimum.accumulate(np.minimum(data[low:high], current_min))
+        rebounds = data[low:high] >= running_min * (1.0 + (volatility_factor / 100.0))
+        first_rebound = rebounds.argmax()
+        if rebounds[first_rebound]:
+            return low + int(first_rebound)
+        current_min = running_min[-1]
+    return len(data)
+
+
+# pylint: disable=too-many-arguments
+def _find_reentry_index(data: np.ndarray,
+                        start: int,
+                        current_min: float,
+                        volatility_factor: float,
+                        next_slopes_crossed: np.ndarray,
+                        next_reentry_bar: np.ndarray,
+                        chunk_size: int = SEARCH_CHUNK_MIN_SIZE
+                        ) -> Tuple[int, float, bool, bool]:
+    """_find_reentry_index
+
+    Re-entry signal of a stopped out segment that starts on 'start'. The 1 VF rebound off the
+    minimum and the short slope > long slope conditions only need to occur once, while the others
+    (price above the IMA, short slope > 0) are on-going conditions that must hold on the re-entry
+    bar. Only the rebound depends on the segment (through the minimum), so it's the only search;
+    the rest are lookups into the next bar where each condition holds (see
+    _get_next_true_indexes).
+
+    Args:
+        data (np.ndarray): [Close or Adjusted] price
+        start (int): index where the stopped out segment starts (the stop bar)
+        current_min (float): tracked minimum price coming into the segment
+        volatility_factor (float): VF of the fund
+        next_slopes_crossed (np.ndarray): next index where the short slope > long slope
+        next_reentry_bar (np.ndarray): next index where the on-going conditions hold
+        chunk_size (int, optional): size of the first search chunk. Defaults to
+            SEARCH_CHUNK_MIN_SIZE.
+
+    Returns:
+        Tuple[int, float, bool, bool]: re-entry index (-1 if never re-entered), minimum tracked up
+            to and including the re-entry bar, and whether the rebound and slope crossing
+            conditions stand at the end of the data (if never re-entered)
+    """
+    rebound_index = _find_rebound_index(data, start, current_min, volatility_factor, chunk_size)
+    reentry_index = int(next_reentry_bar[max(rebound_index, next_slopes_crossed[start])])
+    end = reentry_index + 1 if reentry_index < len(data) else len(data)
+
+    current_min = min(current_min, np.minimum.reduce(data[start:end]))
+
+    if reentry_index < len(data):
+        return reentry_index, current_min, False, False
+    slopes_crossed = bool(next_slopes_crossed[start] < len(data))
+    return -1, current_min, rebound_index < len(data), slopes_crossed
+
+
+def _get_event_log(index: int, price: float, event: StopLossEventType) -> StopLossEventLogType:
+    """ Build a single stop loss event log entry """
+    log = StopLossEventLogType()
+    log.index = index
+    log.price = np.round(price, 2)
+    log.event = event
+    return log
+
+
+def _get_new_minimum_indexes(data: np.ndarray,
+                             is_stopped: np.ndarray,
+                             first_min: float) -> np.ndarray:
+    """ Indexes of the new minimums: the tracked minimum only moves on stopped out bars, so it's a
+    running minimum over all of them, starting from first_min """
+    stopped_indexes = np.flatnonzero(is_stopped)
+    prices = data[stopped_indexes]
+    running_min = np.minimum.accumulate(np.minimum(prices, first_min))
+    previous_min = np.concatenate(([first_min], running_min[:-1]))
+    return stopped_indexes[prices < previous_min]
+
+
+def _get_event_logs(data: np.ndarray,
+                    stop_indexes: List[int],
+                    minimum_indexes: np.ndarray,
+                    activate_indexes: List[int]) -> List[StopLossEventLogType]:
+    """ Build the event log of a run in bar order (on a bar: stop, then minimum, then activate),
+    with all prices rounded at once """
+    event_types = (StopLossEventType.STOP, StopLossEventType.MINIMUM, StopLossEventType.ACTIVATE)
+    indexes = np.concatenate((stop_indexes, minimum_indexes, activate_indexes)).astype(int)
+    events = np.repeat(
+        [0, 1, 2], [len(stop_indexes), len(minimum_indexes), len(activate_indexes)])
+    order = np.lexsort((events, indexes))
+    prices = np.round(data[indexes[order]], 2)
+
+    logs = []
+    for index, price, event in zip(indexes[order].tolist(), prices, events[order].tolist()):
+        log = StopLossEventLogType()
+        log.index = index
+        log.price = price
+        log.event = event_types[event]
+        logs.append(log)
+    return logs
+
+
+def _get_stop_loss_object(data: np.ndarray,
+                          start: int,
+                          end: int,
+                          running_max: np.ndarray,
+                          volatility_factor: float,
+                          min_vf: float) -> VFTimeSeriesType:
+    """ Build the VFTimeSeriesType of an active segment (start to end, inclusive) """
+    sl_data = VFTimeSeriesType(running_max[start:end + 1], start, volatility_factor, min_vf)
+    sl_data.max_price = running_max[end]
+    sl_data.max_price_index = start + int(data[start:end + 1].argmax())
+    return sl_data
+
+
+class StopLossState:
+    """ Stop Loss State
+
+    Resumable state of the stop loss / re-entry state machine of generate_stop_loss_data_set, so
+    that a fund's stops can be kept current by feeding one new bar at a time (update) instead of
+    regenerating the full history. Serializable with to_dict / from_dict (JSON-compatible).
+    """
+    # pylint: disable=too-many-instance-attributes
+    volatility_factor: float
+    min_vf: float
+    index: int
+    mode: str
+    current_max: float
+    max_price_index: int
+    segment_start: int
+    current_min: float
+    num_times_below_sl: int
+    rebounded: bool
+    slopes_crossed: bool
+    event_log: List[StopLossEventLogType]
+
+    def __init__(self, volatility_factor: float, min_vf: float):
+        self.volatility_factor = volatility_factor
+        self.min_vf = min_vf
+        self.index = -1
+        self.mode = 'active'
+        self.current_max = 0.0
+        self.max_price_index = 0
+        self.segment_start = 0
+        self.current_min = 0.0
+        self.num_times_below_sl = 0
+        self.rebounded = False
+        self.slopes_crossed = False
+        self.event_log = []
+
+    @property
+    def stop_loss(self) -> float:
+        """ current stop loss price (of the active or, if stopped out, last active segment) """
+        return get_stop_loss_from_value(self.current_max, self.volatility_factor)
+
+    @property
+    def caution_line(self) -> float:
+        """ current caution line price """
+        return get_caution_line_from_value(self.current_max, self.volatility_factor)
+
+    @property
+    def conservative_line(self) -> float:
+        """ current conservative line price """
+        return get_stop_loss_from_value(self.current_max, self.min_vf)
+
+    def _log(self, price: float, event: StopLossEventType) -> StopLossEventLogType:
+        log = _get_event_log(self.index, price, event)
+        self.event_log.append(log)
+        return log
+
+    def update(self,
+               price: float,
+               intelligent_moving_average: float,
+               ima_short_slope: float,
+               ima_long_slope: float) -> List[StopLossEventLogType]:
+        """update
+
+        Advance the state machine by one bar, in O(1).
+
+        Args:
+            price (float): [Close or Adjusted] price of the new bar
+            intelligent_moving_average (float): IMA value of the new bar
+            ima_short_slope (float): short slope of the IMA of the new bar
+            ima_long_slope (float): long slope of the IMA of the new bar
+
+        Returns:
+            List[StopLossEventLogType]: events triggered by the new bar (also added to event_log)
+        """
+        # pylint: disable=too-many-branches
+        events = []
+        self.index += 1
+        if self.index == 0:
+            self.current_max = price
+            self.current_min = 100.0 * price
+            return events
+
+        if self.mode == 'active':
+            if price > self.current_max:
+                self.current_max = price
+                self.max_price_index = self.index
+            if price >= self.stop_loss:
+                self.num_times_below_sl = 0
+
+            if price < self.stop_loss:
+                self.num_times_below_sl += 1
+                error_zone = ERROR_ZONE_THRESHOLD_MAX * (self.min_vf / 50.0)
+                if price >= self.stop_loss * (1.0 - error_zone):
+                    # Fund popped up within the error zone, so we'll ignore it for now
+                    self.num_times_below_sl -= 1
+
+                if self.num_times_below_sl > 1:
+                    self.num_times_below_sl = 0
+                    self.mode = 'stopped'
+                    events.append(self._log(price, StopLossEventType.STOP))
+
+        if self.mode == 'stopped':
+            if price < self.current_min:
+                self.current_min = price
+                events.append(self._log(price, StopLossEventType.MINIMUM))
+
+            if price >= get_stop_loss_from_value(
+                    self.current_min, self.volatility_factor, is_up_from=True):
+                self.rebounded = True
+            if ima_short_slope > ima_long_slope:
+                self.slopes_crossed = True
+
+            if self.rebounded and self.slopes_crossed and price > intelligent_moving_average \
+                    and ima_short_slope > 0.0:
+                self.mode = 'active'
+                self.rebounded = False
+                self.slopes_crossed = False
+                self.current_max = price
+                self.max_price_index = self.index
+                self.segment_start = self.index
+                events.append(self._log(price, StopLossEventType.ACTIVATE))
+
+        return events
+
+    def to_dict(self) -> dict:
+        """ JSON-compatible dictionary of the state """
+        return {
+            "volatility_factor": float(self.volatility_factor),
+            "min_vf": float(self.min_vf),
+            "index": int(self.index),
+            "mode": self.mode,
+            "current_max": float(self.current_max),
+            "max_price_index": int(self.max_price_index),
+            "segment_start": int(self.segment_start),
+            "current_min": float(self.current_min),
+            "num_times_below_sl": int(self.num_times_below_sl),
+            "rebounded": bool(self.rebounded),
+            "slopes_crossed": bool(self.slopes_crossed),
+            "event_log": [
+                {"index": int(log.index), "event": log.event.value, "price": float(log.price)}
+                for log in self.event_log
+            ]
+        }
+
+    @classmethod
+    def from_dict(cls, state_dict: dict) -> 'StopLossState':
+        """ Rebuild the state from a dictionary made by to_dict """
+        state = cls(state_dict["volatility_factor"], state_dict["min_vf"])
+        state.index = state_dict["index"]
+        state.mode = state_dict["mode"]
+        state.current_max = state_dict["current_max"]
+        state.max_price_index = state_dict["max_price_index"]
+        state.segment_start = state_dict["segment_start"]
+        state.current_min = state_dict["current_min"]
+        state.num_times_below_sl = state_dict["num_times_below_sl"]
+        state.rebounded = state_dict["rebounded"]
+        state.slopes_crossed = state_dict["slopes_crossed"]
+        state.event_log = [
+            _get_event_log(log["index"], log["price"], StopLossEventType(log["event"]))
+            for log in state_dict["event_log"]
+        ]
+        return state
+
+
+# pylint: disable=too-many-arguments
+def _run_stop_loss_engine(data: np.ndarray,
+                          volatility_factor: float,
+                          intelligent_moving_average: np.ndarray,
+                          ima_short_slope: np.ndarray,
+                          ima_long_slope: np.ndarray,
+                          min_vf: float) -> Tuple[
+                              List[VFTimeSeriesType], List[StopLossEventLogType], StopLossState]:
+    """_run_stop_loss_engine
+
+    Active segments are computed vectorized (their lines are the running max times constant
+    factors); the sequential logic only runs once per stop / re-entry transition. Each search
+    starts with a chunk the size of the previous segment of its kind, and event prices are rounded
+    all at once, so a transition costs a handful of numpy calls (see tests/benchmark_stop_loss.py).
+
+    Returns:
+        Tuple[List[VFTimeSeriesType], List[StopLossEventLogType], StopLossState]: stop loss
+            objects, event log, and the state machine's state after the last bar
+    """
+    # pylint: disable=too-many-locals
+    stop_loss_objects = []
+    stop_indexes = []
+    activate_indexes = []
+    is_stopped = np.zeros(len(data), dtype=bool)
+    state = StopLossState(volatility_factor, min_vf)
+    state.index = len(data) - 1
+
+    # Every active segment's running max is a view into this one buffer
+    running_max = np.empty(len(data))
+
+    # Re-entry conditions that don't depend on the segment, as lookups of the next bar they hold
+    next_slopes_crossed = _get_next_true_indexes(ima_short_slope > ima_long_slope)
+    next_reentry_bar = _get_next_true_indexes(
+        (data > intelligent_moving_average) & (ima_short_slope > 0.0))
+
+    # Searches start with chunks the size of the previous segment of the same kind
+    active_size = SEARCH_CHUNK_MIN_SIZE
+    stopped_size = SEARCH_CHUNK_MIN_SIZE
+
+    # The minimum tracked while stopped out is carried across every stopped out segment
+    first_min = 100.0 * data[0]
+    current_min = first_min
+    start = 0
+    while start < len(data):
+        stop_index, num_times_below_sl = _find_stop_index(
+            data, start, volatility_factor, min_vf, running_max, active_size)
+        if stop_index < 0:
+            stop_loss_objects.append(_get_stop_loss_object(
+                data, start, len(data) - 1, running_max, volatility_factor, min_vf))
+            state.num_times_below_sl = num_times_below_sl
+            break
+
+        stop_loss_objects.append(_get_stop_loss_object(
+            data, start, stop_index, running_max, volatility_factor, min_vf))
+        stop_indexes.append(stop_index)
+        active_size = stop_index - start
+
+        reentry_index, current_min, rebounded, slopes_crossed = _find_reentry_index(
+            data, stop_index, current_min, volatility_factor, next_slopes_crossed,
+            next_reentry_bar, stopped_size)
+        if reentry_index < 0:
+            is_stopped[stop_index:] = True
+            state.mode = 'stopped'
+            state.rebounded = rebounded
+            state.slopes_crossed = slopes_crossed
+            break
+
+        is_stopped[stop_index:reentry_index + 1] = True
+        activate_indexes.append(reentry_index)
+        stopped_size = reentry_index - stop_index
+        if reentry_index == stop_index:
+            # Re-entered on the stop bar itself, so the next segment would overwrite the last
+            # running max value of this one in the shared buffer
+            stop_loss_objects[-1].running_max = stop_loss_objects[-1].running_max.copy()
+        start = reentry_index
+
+    stop_loss_logs = _get_event_logs(
+        data, stop_indexes, _get_new_minimum_indexes(data, is_stopped, first_min),
+        activate_indexes)
+    state.current_max = stop_loss_objects[-1].max_price
+    state.max_price_index = stop_loss_objects[-1].max_price_index
+    state.segment_start = stop_loss_objects[-1].start_index
+    state.current_min = current_min
+    state.event_log = list(stop_loss_logs)
+    return stop_loss_objects, stop_loss_logs, state
+
+
 # pylint: disable=too-many-arguments
 def generate_stop_loss_data_set(data: list,
                                 volatility_factor: float,
@@ -92,6 +549,9 @@ def generate_stop_loss_data_set(data: list,
     The underlying logic function that creates the stop loss curves. This function also generates
     the re-entry signals and restarts the new stop loss automatically.
 
+    Active segments are computed vectorized (their lines are the running max times constant
+    factors); the sequential logic only runs once per stop / re-entry transition.
+
     Args:
         data (list): [Close or Adjusted] price
         volatility_factor (float): VF of the fund
@@ -99,134 +559,395 @@ def generate_stop_loss_data_set(data: list,
         ima_short_slope (list): the short slope of the intelligent moving average
         ima_long_slope (list): the longer moving average of the slope of the intelligent moving
             average
+        min_vf (float): historical (conservative) VF of the fund
 
     Returns:
         Tuple[ List[VFTimeSeriesType], List[StopLossEventLogType]]
     """
-    # pylint: disable=too-many-branches,too-many-statements
-    stop_loss_objects = []
-    stop_loss_logs = []
-
-    current_max = [0, data[0]]
-    current_min = [0, 100.0 * data[0]]
-    mode = 'active'
-    reset_stop = [False, False, False, False, False]
-
-    sl_data = VFTimeSeriesType()
-    sl_data.caution_line.append(get_caution_line_from_value(data[0], volatility_factor))
-    sl_data.max_price = data[0]
-    sl_data.max_price_index = 0
-    sl_data.stop_loss_line.append(get_stop_loss_from_value(data[0], volatility_factor))
-    sl_data.conservative_line.append(get_stop_loss_from_value(data[0], min_vf))
-    sl_data.time_index_list.append(0)
-
-    num_times_below_sl = 0
-    for i in range(1, len(data)):
-        if mode == 'active':
-            if data[i] > current_max[1]:
-                current_max[1] = data[i]
-                current_max[0] = i
-                sl_data.max_price = data[i]
-                sl_data.max_price_index = i
-                sl_data.stop_loss_line.append(get_stop_loss_from_value(data[i], volatility_factor))
-                sl_data.time_index_list.append(i)
-                sl_data.caution_line.append(get_caution_line_from_value(data[i], volatility_factor))
-                sl_data.conservative_line.append(get_stop_loss_from_value(data[i], min_vf))
-            else:
-                # We need to set anyway
-                sl_data.caution_line.append(sl_data.caution_line[-1])
-                sl_data.stop_loss_line.append(sl_data.stop_loss_line[-1])
-                sl_data.conservative_line.append(sl_data.conservative_line[-1])
-                sl_data.time_index_list.append(i)
-
-            if data[i] >= sl_data.stop_loss_line[-1]:
-                num_times_below_sl = 0
-
-        if mode == 'active' and data[i] < sl_data.stop_loss_line[-1]:
-            # Officially a STOPPED OUT condition (if 2nd consecutive time with adjusted stop loss)
-            # This prevents sideways motion or bottoming before major rebounds to be missed
-            # completely by a single bad day.
-            num_times_below_sl += 1
-            if num_times_below_sl > 0:
-                # We'll check to see if it rebounded within our SL "measurement error zone"
-                error_zone = ERROR_ZONE_THRESHOLD_MAX * (min_vf / 50.0)
-                adj_error_zone_stop_loss = sl_data.stop_loss_line[-1] * (1.0 - error_zone)
-                if data[i] >= adj_error_zone_stop_loss:
-                    # Fund popped up within the error zone, so we'll ignore it for now
-                    num_times_below_sl -= 1
-
-            if num_times_below_sl > 1:
-                num_times_below_sl = 0
-                mode = 'stopped'
-                current_max[1] = 0.0
-                log = StopLossEventLogType()
-                log.index = i
-                log.price = np.round(data[i], 2)
-                stop_loss_logs.append(log)
-                stop_loss_objects.append(sl_data)
-
-        if mode == 'stopped':
-            # First, track minimum...
-            if data[i] < current_min[1]:
-                current_min[1] = data[i]
-                current_min[0] = i
-                log = StopLossEventLogType()
-                log.index = i
-                log.price = np.round(data[i], 2)
-                log.event = StopLossEventType.MINIMUM
-                stop_loss_logs.append(log)
-
-            # Next, price has to rebound 1 VF % (once)
-            if data[i] >= get_stop_loss_from_value(
-                current_min[1], volatility_factor, is_up_from=True) \
-                and not reset_stop[0]:
-                reset_stop[0] = True
-
-            # Next, price has to be above the IMA (on-going condition, thus the reset)
-            if reset_stop[0] and data[i] > intelligent_moving_average[i]:
-                reset_stop[1] = True
-            else:
-                reset_stop[1] = False
-
-            # Next, short-time slope of IMA must be > 0 (on-going)
-            if reset_stop[1] and ima_short_slope[i] > 0.0:
-                reset_stop[2] = True
-            else:
-                reset_stop[2] = False
-
-            # Next, long-time slope of IMA must be > 0 (on-going)
-            if reset_stop[2] and ima_long_slope[i] > 0.0:
-                reset_stop[3] = True
-            else:
-                reset_stop[3] = True
-
-            # Finally, short_slope > long_slope (on-going)
-            if reset_stop[3] and ima_short_slope[i] > ima_long_slope[i]:
-                reset_stop[4] = True
-
-            if all(reset_stop):
-                # WE DID IT! We're back in!
-                mode = 'active'
-                reset_stop = [False for _ in reset_stop]
-                current_max[1] = data[i]
-                current_max[0] = i
-
-                sl_data = VFTimeSeriesType()
-                sl_data.stop_loss_line.append(get_stop_loss_from_value(data[i], volatility_factor))
-                sl_data.conservative_line.append(get_stop_loss_from_value(data[i], min_vf))
-                sl_data.max_price = data[i]
-                sl_data.max_price_index = i
-                sl_data.time_index_list.append(i)
-                sl_data.caution_line.append(get_caution_line_from_value(data[i], volatility_factor))
-
-                log = StopLossEventLogType()
-                log.index = i
-                log.price = np.round(data[i], 2)
-                log.event = StopLossEventType.ACTIVATE
-                stop_loss_logs.append(log)
-
-    if mode == 'active':
-        # We need to include the stop_loss object at the end if it's still good to go
-        stop_loss_objects.append(sl_data)
-
+    stop_loss_objects, stop_loss_logs, _ = _run_stop_loss_engine(
+        np.asarray(data, dtype=float),
+        volatility_factor,
+        np.asarray(intelligent_moving_average, dtype=float),
+        np.asarray(ima_short_slope, dtype=float),
+        np.asarray(ima_long_slope, dtype=float),
+        min_vf
+    )
     return stop_loss_objects, stop_loss_logs
+
+
+# pylint: disable=too-many-arguments
+def get_stop_loss_state(data: list,
+                        volatility_factor: float,
+                        intelligent_moving_average: list,
+                        ima_short_slope: list,
+                        ima_long_slope: list,
+                        min_vf: float) -> StopLossState:
+    """get_stop_loss_state
+
+    Run generate_stop_loss_data_set over a price history and return the state machine's state
+    after its last bar, ready to be fed new bars with StopLossState.update.
+
+    Args:
+        data (list): [Close or Adjusted] price
+        volatility_factor (float): VF of the fund
+        intelligent_moving_average (list): data set of the intelligent moving average
+        ima_short_slope (list): the short slope of the intelligent moving average
+        ima_long_slope (list): the longer moving average of the slope of the intelligent moving
+            average
+        min_vf (float): historical (conservative) VF of the fund
+
+    Returns:
+        StopLossState: resumable state
+    """
+    _, _, state = _run_stop_loss_engine(
+        np.asarray(data, dtype=float),
+        volatility_factor,
+        np.asarray(intelligent_moving_average, dtype=float),
+        np.asarray(ima_short_slope, dtype=float),
+        np.asarray(ima_long_slope, dtype=float),
+        min_vf
+    )
+    return state
+
+
+class _LockStepStopLossState:
+    """ Stop loss state machine state for many rows (parameter sets or tickers) at once """
+    # pylint: disable=too-few-public-methods,too-many-instance-attributes
+
+    def __init__(self, first_prices: np.ndarray):
+        num_rows = len(first_prices)
+        self.active = np.ones(num_rows, dtype=bool)
+        self.current_max = first_prices.copy()
+        self.max_price_index = np.zeros(num_rows, dtype=int)
+        self.current_min = 100.0 * first_prices
+        self.num_times_below_sl = np.zeros(num_rows, dtype=int)
+        self.rebounded = np.zeros(num_rows, dtype=bool)
+        self.slopes_crossed = np.zeros(num_rows, dtype=bool)
+        self.entry_price = first_prices.copy()
+        self.growth = np.ones(num_rows)
+        self.num_stops = np.zeros(num_rows, dtype=int)
+        self.num_bars_in_market = np.ones(num_rows, dtype=int)
+
+
+# pylint: disable=too-many-locals
+def _run_lock_step_stop_loss(data: np.ndarray,
+                             intelligent_moving_average: np.ndarray,
+                             ima_short_slope: np.ndarray,
+                             ima_long_slope: np.ndarray,
+                             volatility_factors: np.ndarray,
+                             min_vfs: np.ndarray,
+                             error_zone_thresholds: np.ndarray,
+                             in_market: Union[np.ndarray, None] = None) -> _LockStepStopLossState:
+    """_run_lock_step_stop_loss
+
+    The generate_stop_loss_data_set state machine, advanced one bar at a time for every row at
+    once, with transitions applied by masks.
+
+    Args:
+        data (np.ndarray): price, shape (rows x time) (may be a broadcast view)
+        intelligent_moving_average (np.ndarray): IMA, shape (rows x time)
+        ima_short_slope (np.ndarray): short slope of the IMA, shape (rows x time)
+        ima_long_slope (np.ndarray): long slope of the IMA, shape (rows x time)
+        volatility_factors (np.ndarray): VF per row
+        min_vfs (np.ndarray): historical (conservative) VF per row
+        error_zone_thresholds (np.ndarray): ERROR_ZONE_THRESHOLD_MAX per row
+        in_market (Union[np.ndarray, None], optional): [modified] boolean buffer (rows x time)
+            that records which bars are covered by an active segment. Defaults to None.
+
+    Returns:
+        _LockStepStopLossState: final state of every row
+    """
+    stop_loss_factor = 1.0 - (volatility_factors / 100.0)
+    rebound_factor = 1.0 + (volatility_factors / 100.0)
+    error_zone_factor = 1.0 - error_zone_thresholds * (min_vfs / 50.0)
+
+    state = _LockStepStopLossState(np.array(data[:, 0], dtype=float))
+    if in_market is not None:
+        in_market[:, 0] = True
+
+    for i in range(1, data.shape[1]):
+        price = data[:, i]
+        was_active = state.active.copy()
+
+        # Active: track the max, then count strikes below the (error zone adjusted) stop loss
+        new_max = was_active & (price > state.current_max)
+        state.current_max[new_max] = price[new_max]
+        state.max_price_index[new_max] = i
+        stop_loss = state.current_max * stop_loss_factor
+        state.num_times_below_sl[was_active & (price >= stop_loss)] = 0
+        state.num_times_below_sl[was_active & (price < stop_loss * error_zone_factor)] += 1
+
+        stopped_out = was_active & (state.num_times_below_sl > 1)
+        state.num_times_below_sl[stopped_out] = 0
+        state.active[stopped_out] = False
+        state.num_stops += stopped_out
+        state.growth[stopped_out] *= price[stopped_out] / state.entry_price[stopped_out]
+
+        # Stopped (including those stopped out on this very bar): watch for re-entry
+        stopped = ~state.active
+        np.minimum(state.current_min, price, out=state.current_min, where=stopped)
+        state.rebounded |= stopped & (price >= state.current_min * rebound_factor)
+        state.slopes_crossed |= stopped & (ima_short_slope[:, i] > ima_long_slope[:, i])
+        reentry = stopped & state.rebounded & state.slopes_crossed \
+            & (price > intelligent_moving_average[:, i]) & (ima_short_slope[:, i] > 0.0)
+
+        state.active[reentry] = True
+        state.current_max[reentry] = price[reentry]
+        state.max_price_index[reentry] = i
+        state.entry_price[reentry] = price[reentry]
+        state.rebounded[reentry] = False
+        state.slopes_crossed[reentry] = False
+        state.num_bars_in_market += was_active | reentry
+        if in_market is not None:
+            in_market[:, i] = was_active | reentry
+
+    last_price = np.asarray(data[:, -1], dtype=float)
+    state.growth[state.active] *= last_price[state.active] / state.entry_price[state.active]
+    return state
+
+
+def sweep_volatility_factors(data: list,
+                             intelligent_moving_average: list,
+                             ima_short_slope: list,
+                             ima_long_slope: list,
+                             volatility_factors: List[float],
+                             min_vfs: Union[List[float], None] = None,
+                             error_zone_thresholds: Union[List[float], None] = None
+                             ) -> VFSweepResultType:
+    """sweep_volatility_factors
+
+    Evaluate the stop loss / re-entry logic of generate_stop_loss_data_set for a whole grid of
+    parameters in one pass over the price data (each bar is stepped once, for every parameter set
+    at once), rather than one full pass per parameter set.
+
+    The grid is every combination of volatility_factors, min_vfs and error_zone_thresholds.
+
+    Args:
+        data (list): [Close or Adjusted] price
+        intelligent_moving_average (list): data set of the intelligent moving average
+        ima_short_slope (list): the short slope of the intelligent moving average
+        ima_long_slope (list): the longer moving average of the slope of the intelligent moving
+            average
+        volatility_factors (List[float]): VFs to evaluate
+        min_vfs (Union[List[float], None], optional): historical (conservative) VFs to evaluate.
+            Defaults to None, which uses min_vf = VF (i.e. no stored history).
+        error_zone_thresholds (Union[List[float], None], optional): values of
+            ERROR_ZONE_THRESHOLD_MAX to evaluate. Defaults to None ([ERROR_ZONE_THRESHOLD_MAX]).
+
+    Returns:
+        VFSweepResultType: per parameter set: number of stops, fraction of bars in the market
+            (active), and the return of holding only while active
+    """
+    if error_zone_thresholds is None:
+        error_zone_thresholds = [ERROR_ZONE_THRESHOLD_MAX]
+
+    grid = VFSweepResultType()
+    if min_vfs is None:
+        vf_grid, ez_grid = np.meshgrid(
+            np.asarray(volatility_factors, dtype=float),
+            np.asarray(error_zone_thresholds, dtype=float),
+            indexing='ij'
+        )
+        min_vf_grid = vf_grid
+    else:
+        vf_grid, min_vf_grid, ez_grid = np.meshgrid(
+            np.asarray(volatility_factors, dtype=float),
+            np.asarray(min_vfs, dtype=float),
+            np.asarray(error_zone_thresholds, dtype=float),
+            indexing='ij'
+        )
+    grid.volatility_factor = vf_grid.ravel()
+    grid.min_vf = min_vf_grid.ravel()
+    grid.error_zone_threshold = ez_grid.ravel()
+
+    # Every parameter set sees the same series, so broadcast views avoid any copies
+    shape = (len(grid.volatility_factor), len(data))
+    state = _run_lock_step_stop_loss(
+        np.broadcast_to(np.asarray(data, dtype=float), shape),
+        np.broadcast_to(np.asarray(intelligent_moving_average, dtype=float), shape),
+        np.broadcast_to(np.asarray(ima_short_slope, dtype=float), shape),
+        np.broadcast_to(np.asarray(ima_long_slope, dtype=float), shape),
+        grid.volatility_factor,
+        grid.min_vf,
+        grid.error_zone_threshold
+    )
+
+    grid.num_stops = state.num_stops
+    grid.time_in_market = state.num_bars_in_market / float(len(data))
+    grid.returns = state.growth - 1.0
+    return grid
+
+
+# pylint: disable=too-many-arguments
+def simulate_stop_losses(data_matrix: np.ndarray,
+                         ima_matrix: np.ndarray,
+                         ima_short_slope_matrix: np.ndarray,
+                         ima_long_slope_matrix: np.ndarray,
+                         volatility_factors: List[float],
+                         min_vfs: Union[List[float], None] = None) -> VFLockStepResultType:
+    """simulate_stop_losses
+
+    Lock-step variant of generate_stop_loss_data_set for a whole universe of funds: all funds are
+    advanced together, one vectorized step per bar, with the state machine (mode, max, min, re-entry
+    conditions, number of times below the stop loss) held in arrays.
+
+    Args:
+        data_matrix (np.ndarray): [Close or Adjusted] prices, shape (funds x time)
+        ima_matrix (np.ndarray): intelligent moving averages, shape (funds x time)
+        ima_short_slope_matrix (np.ndarray): short slopes of the IMAs, shape (funds x time)
+        ima_long_slope_matrix (np.ndarray): long slopes of the IMAs, shape (funds x time)
+        volatility_factors (List[float]): VF of each fund
+        min_vfs (Union[List[float], None], optional): historical (conservative) VF of each fund.
+            Defaults to None, which uses min_vf = VF.
+
+    Returns:
+        VFLockStepResultType: per fund results, see type
+    """
+    data_matrix = np.atleast_2d(np.asarray(data_matrix, dtype=float))
+    results = VFLockStepResultType()
+    results.volatility_factor = np.asarray(volatility_factors, dtype=float)
+    results.min_vf = results.volatility_factor if min_vfs is None \
+        else np.asarray(min_vfs, dtype=float)
+    results.error_zone_threshold = np.full(
+        len(results.volatility_factor), ERROR_ZONE_THRESHOLD_MAX)
+    results.in_market = np.zeros(data_matrix.shape, dtype=bool)
+
+    state = _run_lock_step_stop_loss(
+        data_matrix,
+        np.atleast_2d(np.asarray(ima_matrix, dtype=float)),
+        np.atleast_2d(np.asarray(ima_short_slope_matrix, dtype=float)),
+        np.atleast_2d(np.asarray(ima_long_slope_matrix, dtype=float)),
+        results.volatility_factor,
+        results.min_vf,
+        results.error_zone_threshold,
+        in_market=results.in_market
+    )
+
+    results.num_stops = state.num_stops
+    results.time_in_market = state.num_bars_in_market / float(data_matrix.shape[1])
+    results.returns = state.growth - 1.0
+    results.is_active = state.active
+    results.max_price = state.current_max
+    results.max_price_index = state.max_price_index
+    results.stop_loss = state.current_max * (1.0 - (results.volatility_factor / 100.0))
+    return results
+
+
+class VolatilityFactorAccumulator:
+    """ Volatility Factor Accumulator
+
+    Incremental version of the VF stage of IntelliStop.calculate_vf_stops_data: the SMA-200
+    detrending, both rolling std variants (fixed and derived windows) with their above / below
+    SMA means, the price average and the max price are all kept as running state, so the VF can be
+    refreshed on every new bar in constant time instead of re-running the whole stage. The derived
+    window (from the spectrum of the detrended data) is fixed at creation.
+    """
+    sma_size: int = 200
+
+    def __init__(self, derived_window: int, alternate_window: int = NON_DERIVED_WINDOW):
+        self.sma = SimpleMovingAverageStream(self.sma_size)
+        self.alternate = RollingStdAccumulator(alternate_window)
+        self.derived = RollingStdAccumulator(derived_window)
+        self.price_sum = 0.0
+        self.count = 0
+        self.max_price = -np.inf
+        self.max_price_index = -1
+
+    def _update_prices(self, prices: np.ndarray):
+        if len(prices) > 0 and np.max(prices) > self.max_price:
+            self.max_price_index = self.count + int(np.argmax(prices))
+            self.max_price = float(prices[self.max_price_index - self.count])
+        self.price_sum += float(np.sum(prices))
+        self.count += len(prices)
+
+    def update(self, price: float) -> float:
+        """update
+
+        Feed the next price
+
+        Args:
+            price (float): price of the new bar
+
+        Returns:
+            float: curated VF after the new bar
+        """
+        detrended = price - self.sma.update(price)
+        self.alternate.update(detrended)
+        self.derived.update(detrended)
+        self._update_prices(np.array([price], dtype=float))
+        return self.curated_vf
+
+    def _get_vf(self, accumulator: RollingStdAccumulator) -> float:
+        root_sq_mean = np.sqrt((accumulator.above_mean ** 2) + (accumulator.below_mean ** 2))
+        return (3.0 * root_sq_mean) / (self.price_sum / self.count) * 100.0
+
+    @property
+    def alternate_vf(self) -> float:
+        """ VF of the fixed-window variant """
+        return self._get_vf(self.alternate)
+
+    @property
+    def derived_vf(self) -> float:
+        """ VF of the derived-window variant """
+        return self._get_vf(self.derived)
+
+    @property
+    def curated_vf(self) -> float:
+        """ average of both VF variants, capped to 50% """
+        return min(float(np.average([self.derived_vf, self.alternate_vf])), 50.0)
+
+    @property
+    def stop_loss(self) -> float:
+        """ curated stop loss from the max price so far """
+        return self.max_price * (1.0 - (self.curated_vf / 100.0))
+
+    @classmethod
+    def from_data_set(cls,
+                      data_set: Union[list, np.ndarray],
+                      derived_window: int,
+                      alternate_window: int = NON_DERIVED_WINDOW) -> 'VolatilityFactorAccumulator':
+        """from_data_set
+
+        Seed an accumulator with a full price history in one vectorized pass
+
+        Args:
+            data_set (Union[list, np.ndarray]): price history
+            derived_window (int): derived variance window (e.g. the min of the top spectrum periods)
+            alternate_window (int, optional): fixed variance window. Defaults to
+                NON_DERIVED_WINDOW.
+
+        Returns:
+            VolatilityFactorAccumulator: accumulator, ready for bar-by-bar updates
+        """
+        prices = np.asarray(data_set, dtype=float)
+        accumulator = cls(derived_window, alternate_window)
+        detrended = prices - accumulator.sma.update(prices)
+        accumulator.alternate = RollingStdAccumulator.from_data_set(detrended, alternate_window)
+        accumulator.derived = RollingStdAccumulator.from_data_set(detrended, derived_window)
+        accumulator._update_prices(prices)
+        return accumulator
+
+    def to_dict(self) -> dict:
+        """ JSON-compatible dictionary of the accumulator state """
+        return {
+            "sma": self.sma.to_dict(),
+            "alternate": self.alternate.to_dict(),
+            "derived": self.derived.to_dict(),
+            "price_sum": float(self.price_sum),
+            "count": int(self.count),
+            "max_price": float(self.max_price),
+            "max_price_index": int(self.max_price_index)
+        }
+
+    @classmethod
+    def from_dict(cls, state_dict: dict) -> 'VolatilityFactorAccumulator':
+        """ Rebuild the accumulator from a dictionary made by to_dict """
+        accumulator = cls.__new__(cls)
+        accumulator.sma = SimpleMovingAverageStream.from_dict(state_dict["sma"])
+        accumulator.alternate = RollingStdAccumulator.from_dict(state_dict["alternate"])
+        accumulator.derived = RollingStdAccumulator.from_dict(state_dict["derived"])
+        accumulator.price_sum = state_dict["price_sum"]
+        accumulator.count = state_dict["count"]
+        accumulator.max_price = state_dict["max_price"]
+        accumulator.max_price_index = state_dict["max_price_index"]
+        return accumulator
@@ -37,7 +37,8 @@ REQUIRES_APP = [
 ]
 
 REQUIRES_DEV = [
-    "pylint==2.15.0"
+    "pylint==2.15.0",
+    "pytest==7.2.0"
 ]
 
 setup(
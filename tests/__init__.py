@@ -0,0 +1 @@
+""" tests """
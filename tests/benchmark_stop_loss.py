@@ -0,0 +1,56 @@
+""" benchmark_stop_loss.py
+
+Timing of generate_stop_loss_data_set against the per-bar reference loop (not part of the test
+run), each given its inputs the way it works on them: arrays for the vectorized engine, lists for
+the per-bar loop. Usage: python -m tests.benchmark_stop_loss
+"""
+import time
+from typing import Callable, Tuple
+
+import numpy as np
+
+from intellistop.libs import (
+    generate_stop_loss_data_set, intelligent_moving_average_array, simple_moving_average_array
+)
+from tests.stop_loss_reference import reference_stop_loss_data_set
+
+
+def get_inputs(num_points: int, seed: int = 1) -> Tuple[np.ndarray, ...]:
+    """ random-walk prices, with their IMA and its short and long slopes """
+    rng = np.random.default_rng(seed)
+    data = 100.0 * np.exp(np.cumsum(rng.normal(0.0003, 0.012, num_points)))
+    ima = intelligent_moving_average_array(data, 200)
+    slope = np.diff(ima, prepend=ima[0])
+    return data, ima, simple_moving_average_array(slope, 15), simple_moving_average_array(slope, 50)
+
+
+def time_function(function: Callable, args: tuple, num_runs: int) -> float:
+    """ best of 3 of the mean time of a call, in seconds """
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(num_runs):
+            function(*args)
+        best = min(best, (time.perf_counter() - start) / num_runs)
+    return best
+
+
+def run_benchmark():
+    """ print the time of each implementation, for a few history lengths and VFs """
+    for num_points, volatility_factor, num_runs in [(1260, 8.0, 50), (5000, 8.0, 20),
+                                                    (20000, 5.0, 5), (20000, 12.0, 5)]:
+        data, ima, short_slope, long_slope = get_inputs(num_points)
+        args = (data, volatility_factor, ima, short_slope, long_slope, volatility_factor)
+        list_args = (data.tolist(), volatility_factor, ima.tolist(), short_slope.tolist(),
+                     long_slope.tolist(), volatility_factor)
+        stop_losses, _ = generate_stop_loss_data_set(*args)
+
+        reference = time_function(reference_stop_loss_data_set, list_args, num_runs)
+        vectorized = time_function(generate_stop_loss_data_set, args, num_runs)
+        print(f"{num_points:6d} bars, VF {volatility_factor:4.1f}, {len(stop_losses):4d} segments: "
+              f"per-bar {reference * 1000.0:7.2f} ms, vectorized {vectorized * 1000.0:7.2f} ms "
+              f"({reference / vectorized:.1f}x)")
+
+
+if __name__ == "__main__":
+    run_benchmark()
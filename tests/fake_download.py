@@ -0,0 +1,64 @@
+""" fake_download.py
+
+Offline stand-in for yf.download (a fetch_function of the download layer), over fixed histories.
+"""
+import threading
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+
+def make_history(dates: np.ndarray, close: np.ndarray) -> pd.DataFrame:
+    """make_history
+
+    Args:
+        dates (np.ndarray): dates of the bars (datetime64[D])
+        close (np.ndarray): close price of each bar
+
+    Returns:
+        pd.DataFrame: history in the columns of yf.download
+    """
+    close = np.asarray(close, dtype=float)
+    return pd.DataFrame(
+        {
+            "Open": close * 0.99,
+            "High": close * 1.01,
+            "Low": close * 0.98,
+            "Close": close,
+            "Adj Close": close,
+            "Volume": np.full(len(close), 1000.0)
+        },
+        index=pd.DatetimeIndex(dates, name="Date")
+    )
+
+
+def make_random_history(end: np.datetime64, num_points: int, seed: int = 0) -> pd.DataFrame:
+    """ random-walk daily history of num_points bars, ending on end """
+    dates = np.arange(end - num_points + 1, end + 1)
+    rng = np.random.default_rng(seed)
+    return make_history(dates, 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.01, num_points))))
+
+
+class FakeDownload:
+    """ yf.download over fixed per-ticker histories (group_by='ticker' format, unknown tickers
+    left out), recording the keyword arguments of each call """
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, histories: dict):
+        self.histories = histories
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, tickers: str, start: Union[str, None] = None, **kwargs) -> pd.DataFrame:
+        with self.lock:
+            self.calls.append({"tickers": tickers, "start": start, **kwargs})
+
+        frames = {}
+        for ticker in tickers.split():
+            if ticker in self.histories:
+                history = self.histories[ticker]
+                frames[ticker] = history[history.index >= start] if start else history
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, axis=1)
@@ -0,0 +1,101 @@
+""" stop_loss_reference.py
+
+Per-bar reference of the stop loss / re-entry state machine (the original loop of
+generate_stop_loss_data_set), for checking and benchmarking the vectorized engine.
+"""
+from typing import List, Tuple
+
+import numpy as np
+
+from intellistop.libs.volatility_factor import ERROR_ZONE_THRESHOLD_MAX
+
+
+# pylint: disable=too-many-arguments,too-many-locals,too-many-branches,too-many-statements
+def reference_stop_loss_data_set(data: list,
+                                 volatility_factor: float,
+                                 intelligent_moving_average: list,
+                                 ima_short_slope: list,
+                                 ima_long_slope: list,
+                                 min_vf: float) -> Tuple[List[dict], List[tuple]]:
+    """reference_stop_loss_data_set
+
+    Args:
+        data (list): [Close or Adjusted] price
+        volatility_factor (float): VF of the fund
+        intelligent_moving_average (list): data set of the intelligent moving average
+        ima_short_slope (list): the short slope of the intelligent moving average
+        ima_long_slope (list): the longer moving average of the slope of the IMA
+        min_vf (float): historical (conservative) VF of the fund
+
+    Returns:
+        Tuple[List[dict], List[tuple]]: active segments (time indexes, lines, max price and its
+            index) and event log entries (index, event value, rounded price)
+    """
+    def new_segment(i):
+        return {
+            "time_index_list": [i],
+            "stop_loss_line": [data[i] * (1.0 - (volatility_factor / 100.0))],
+            "caution_line": [data[i] * (1.0 - (0.6 * volatility_factor / 100.0))],
+            "conservative_line": [data[i] * (1.0 - (min_vf / 100.0))],
+            "max_price": data[i],
+            "max_price_index": i
+        }
+
+    segments = []
+    logs = []
+    current_max = data[0]
+    current_min = 100.0 * data[0]
+    mode = 'active'
+    rebounded = False
+    slopes_crossed = False
+    error_zone = ERROR_ZONE_THRESHOLD_MAX * (min_vf / 50.0)
+    segment = new_segment(0)
+    num_times_below_sl = 0
+
+    for i in range(1, len(data)):
+        if mode == 'active':
+            if data[i] > current_max:
+                current_max = data[i]
+                segment["max_price"] = data[i]
+                segment["max_price_index"] = i
+                segment["stop_loss_line"].append(data[i] * (1.0 - (volatility_factor / 100.0)))
+                segment["caution_line"].append(
+                    data[i] * (1.0 - (0.6 * volatility_factor / 100.0)))
+                segment["conservative_line"].append(data[i] * (1.0 - (min_vf / 100.0)))
+            else:
+                for line in ("stop_loss_line", "caution_line", "conservative_line"):
+                    segment[line].append(segment[line][-1])
+            segment["time_index_list"].append(i)
+
+            stop_loss = segment["stop_loss_line"][-1]
+            if data[i] >= stop_loss:
+                num_times_below_sl = 0
+            elif data[i] < stop_loss * (1.0 - error_zone):
+                num_times_below_sl += 1
+                if num_times_below_sl > 1:
+                    num_times_below_sl = 0
+                    mode = 'stopped'
+                    logs.append((i, 'stop', np.round(data[i], 2)))
+                    segments.append(segment)
+
+        if mode == 'stopped':
+            if data[i] < current_min:
+                current_min = data[i]
+                logs.append((i, 'minimum', np.round(data[i], 2)))
+            if data[i] >= current_min * (1.0 + (volatility_factor / 100.0)):
+                rebounded = True
+            if ima_short_slope[i] > ima_long_slope[i]:
+                slopes_crossed = True
+
+            if rebounded and slopes_crossed and data[i] > intelligent_moving_average[i] \
+                    and ima_short_slope[i] > 0.0:
+                mode = 'active'
+                rebounded = False
+                slopes_crossed = False
+                current_max = data[i]
+                segment = new_segment(i)
+                logs.append((i, 'activate', np.round(data[i], 2)))
+
+    if mode == 'active':
+        segments.append(segment)
+    return segments, logs
@@ -0,0 +1,62 @@
+""" test_api.py """
+import datetime
+
+import numpy as np
+
+from intellistop.libs import download_data, download_data_batch
+from intellistop.libs.lib_types import ConfigProperties
+from tests.fake_download import FakeDownload, make_random_history
+
+
+END = np.datetime64(datetime.date.today(), 'D') - 1
+HISTORIES = {
+    "AAA": make_random_history(END, 250, seed=1),
+    # Shorter history: its rows of the multi-ticker frame start with NaNs
+    "BBB": make_random_history(END, 120, seed=2),
+    "^GSPC": make_random_history(END, 250, seed=3)
+}
+
+
+def _assert_matches_history(ticker_data, history):
+    np.testing.assert_array_equal(ticker_data.dates, history.index.to_numpy(dtype='datetime64[D]'))
+    for column in history.columns:
+        np.testing.assert_array_equal(ticker_data[column], history[column].to_numpy())
+
+
+def test_download_data_batch_splits_tickers():
+    """ one request for all tickers, split into each ticker's own bars """
+    fetch = FakeDownload(HISTORIES)
+    data = download_data_batch(["AAA", "BBB", "AAA"], ConfigProperties(), fetch_function=fetch)
+
+    assert len(fetch.calls) == 1
+    assert fetch.calls[0]["tickers"] == "AAA BBB"
+    assert fetch.calls[0]["threads"]
+    assert set(data) == {"AAA", "BBB"}
+    _assert_matches_history(data["AAA"], HISTORIES["AAA"])
+    _assert_matches_history(data["BBB"], HISTORIES["BBB"])
+
+
+def test_download_data_batch_reports_missing_tickers_as_empty():
+    """ tickers the download doesn't have are still in the result, with no bars """
+    data = download_data_batch(["AAA", "ZZZ"], ConfigProperties(),
+                               fetch_function=FakeDownload(HISTORIES))
+
+    _assert_matches_history(data["AAA"], HISTORIES["AAA"])
+    assert len(data["ZZZ"]["Close"]) == 0
+
+
+def test_include_bench_adds_benchmark():
+    """ include_bench adds ^GSPC to the request (once), in the batch and single downloads """
+    config = ConfigProperties({"include_bench": True})
+    fetch = FakeDownload(HISTORIES)
+
+    data = download_data_batch(["AAA", "BBB"], config, fetch_function=fetch)
+    assert fetch.calls[-1]["tickers"] == "AAA BBB ^GSPC"
+    _assert_matches_history(data["^GSPC"], HISTORIES["^GSPC"])
+
+    download_data_batch(["^GSPC", "AAA"], config, fetch_function=fetch)
+    assert fetch.calls[-1]["tickers"] == "^GSPC AAA"
+
+    data = download_data("AAA", config, fetch_function=fetch)
+    assert fetch.calls[-1]["tickers"] == "AAA ^GSPC"
+    assert set(data) == {"AAA", "^GSPC"}
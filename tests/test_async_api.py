@@ -0,0 +1,94 @@
+""" test_async_api.py """
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from intellistop.libs import download_data_concurrent
+from intellistop.libs.lib_types import ConfigProperties
+from tests.fake_download import make_random_history
+
+
+class _FlakyFetch:
+    """ Single-ticker fetch that fails a set number of times per ticker before returning its
+    history, recording the time of each call and the number of calls in flight """
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, failures: dict, delay: float = 0.0):
+        self.failures = failures
+        self.delay = delay
+        self.calls = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, tickers: str, **_kwargs) -> pd.DataFrame:
+        with self.lock:
+            self.calls.setdefault(tickers, []).append(time.monotonic())
+            num_calls = len(self.calls[tickers])
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self.lock:
+            self.in_flight -= 1
+
+        if num_calls <= self.failures.get(tickers, 0):
+            raise ConnectionError(f"{tickers} attempt {num_calls}")
+        return make_random_history(np.datetime64("2024-03-01"), 50)
+
+
+def test_retries_with_backoff():
+    """ failed requests are retried up to max_retries times, with doubling backoff """
+    fetch = _FlakyFetch({"AAA": 2, "BBB": 10})
+    data, errors = download_data_concurrent(
+        ["AAA", "BBB"], ConfigProperties(), fetch_function=fetch, max_retries=3, backoff=0.02)
+
+    assert set(data) == {"AAA"}
+    assert len(fetch.calls["AAA"]) == 3
+    assert len(fetch.calls["BBB"]) == 4
+    assert errors == {"BBB": "ConnectionError: BBB attempt 4"}
+    # Waits of backoff, 2 * backoff, and 4 * backoff before the retries
+    gaps = np.diff(fetch.calls["BBB"])
+    assert np.all(gaps >= 0.9 * np.array([0.02, 0.04, 0.08]))
+
+
+def test_failing_ticker_does_not_cancel_others():
+    """ a ticker that keeps failing is reported on its own; the others still download """
+    fetch = _FlakyFetch({"BAD": 100, "AAA": 1})
+    data, errors = download_data_concurrent(
+        ["AAA", "BAD", "BBB", "CCC"], ConfigProperties(), fetch_function=fetch, max_retries=1,
+        backoff=0.0)
+
+    assert set(data) == {"AAA", "BBB", "CCC"}
+    assert set(errors) == {"BAD"}
+    assert len(fetch.calls["BAD"]) == 2
+    assert len(data["AAA"]["Close"]) == 50
+
+
+def test_empty_result_is_retried_then_reported():
+    """ an empty frame (unknown ticker, or a quietly failed request) counts as a failed attempt """
+    calls = []
+
+    def fetch_nothing(tickers: str, **_kwargs) -> pd.DataFrame:
+        calls.append(tickers)
+        return pd.DataFrame()
+
+    data, errors = download_data_concurrent(
+        ["ZZZ"], ConfigProperties(), fetch_function=fetch_nothing, max_retries=2, backoff=0.0)
+
+    assert not data
+    assert errors == {"ZZZ": "no data"}
+    assert len(calls) == 3
+
+
+def test_concurrency_limit():
+    """ no more than max_concurrency requests are in flight at once """
+    fetch = _FlakyFetch({}, delay=0.02)
+    funds = [f"T{i}" for i in range(12)]
+    data, errors = download_data_concurrent(
+        funds, ConfigProperties(), fetch_function=fetch, max_concurrency=3)
+
+    assert set(data) == set(funds)
+    assert not errors
+    assert 1 < fetch.max_in_flight <= 3
@@ -0,0 +1,35 @@
+""" test_filters.py """
+import numpy as np
+import pytest
+
+from intellistop.libs import filters
+from intellistop.libs import (
+    intelligent_moving_average_array, intelligent_moving_average_bank, simple_moving_average_array
+)
+from intellistop.libs.filters import (
+    exponential_moving_average_array, weighted_moving_average_array
+)
+
+
+def _reference_ima(data: np.ndarray, filter_size: int) -> np.ndarray:
+    """ mean of the SMA, EMA, and WMA, each computed on its own """
+    return (simple_moving_average_array(data, filter_size) +
+            exponential_moving_average_array(data, filter_size) +
+            weighted_moving_average_array(data, filter_size)) / 3.0
+
+
+@pytest.mark.parametrize("block_size", [1, 7, 64, filters.IMA_BLOCK_SIZE])
+def test_intelligent_moving_average_across_blocks(monkeypatch, block_size):
+    """ the block-wise kernel matches the separate averages, whatever the block size """
+    monkeypatch.setattr(filters, "IMA_BLOCK_SIZE", block_size)
+    rng = np.random.default_rng(block_size)
+    data = 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.02, 500)))
+    filter_sizes = [1, 2, 7, 50, 64, 65, 500, 501, 0]
+
+    bank = intelligent_moving_average_bank(data, filter_sizes)
+    for row, filter_size in enumerate(filter_sizes):
+        expected = _reference_ima(data, filter_size) if 1 <= filter_size <= len(data) else data
+        out = np.empty(len(data))
+        assert intelligent_moving_average_array(data, filter_size, out=out) is out
+        np.testing.assert_allclose(out, expected, rtol=1e-12)
+        np.testing.assert_array_equal(bank[row], out)
@@ -0,0 +1,28 @@
+""" test_fourier.py """
+import numpy as np
+
+from intellistop.libs.fourier import get_top_periods, get_fourier_spectrum_batch
+
+
+def _sorted_top_periods(x_fft: np.ndarray, y_spectrum: np.ndarray, data_length: int) -> list:
+    """ Reference: the original stable sort of the (frequency, power) pairs """
+    pairs = sorted(zip(x_fft, y_spectrum), key=lambda pair: pair[1], reverse=True)
+    return [1.0 / pair[0] if pair[0] != 0 else data_length * 10.0 for pair in pairs[0:10]]
+
+
+def test_top_periods_ties_keep_frequency_order():
+    """ ties at (and above) the top-10 cutoff keep ascending frequency order """
+    rng = np.random.default_rng(3)
+    x_fft = np.fft.rfftfreq(80, 1.0)[0:40]
+    for y_spectrum in [np.zeros(40), rng.integers(0, 3, 40).astype(float), rng.normal(size=40)]:
+        assert get_top_periods(x_fft, y_spectrum, 80) == _sorted_top_periods(x_fft, y_spectrum, 80)
+
+
+def test_top_periods_batch_matches_single():
+    """ each row of the batch matches the reference, rows with and without ties mixed """
+    rng = np.random.default_rng(4)
+    data_matrix = rng.normal(size=(20, 100))
+    data_matrix[0:5] = 1.0
+    x_fft, y_spectra, top_periods = get_fourier_spectrum_batch(data_matrix)
+    for y_spectrum, periods in zip(y_spectra, top_periods):
+        assert periods.tolist() == _sorted_top_periods(x_fft, y_spectrum, 100)
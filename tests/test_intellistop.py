@@ -0,0 +1,55 @@
+""" test_intellistop.py """
+import threading
+
+from intellistop import IntelliStop
+from intellistop.libs import SyntheticProvider
+
+
+class _CountingProvider(SyntheticProvider):
+    """ Synthetic data that records the tickers requested """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.tickers = []
+        self.lock = threading.Lock()
+
+    def get_ticker_data(self, ticker, config):
+        with self.lock:
+            self.tickers.append(ticker)
+        return super().get_ticker_data(ticker, config)
+
+
+def test_run_analysis_for_tickers_matches_single_runs():
+    """ threaded batch results match one fund at a time """
+    config = {"data_provider": "synthetic", "data_provider_args": {"seed": 3, "num_years": 8}}
+    funds = [f"T{i}" for i in range(6)]
+    stops = IntelliStop(config)
+    expected = {}
+    for fund in funds:
+        vf_data, has_error = stops.run_analysis_for_ticker(fund)
+        assert not has_error
+        expected[fund] = (vf_data.vf.curated, vf_data.stop_loss.curated, len(vf_data.data_sets))
+
+    results = {
+        fund: (vf_data.vf.curated, vf_data.stop_loss.curated, len(vf_data.data_sets))
+        for fund, vf_data, _ in IntelliStop(config).run_analysis_for_tickers(
+            funds, workers=2, use_threads=True)
+    }
+    assert results == expected
+
+
+def test_run_analysis_for_tickers_cancels_when_closed():
+    """ closing the generator after the first result cancels the pending funds """
+    provider = _CountingProvider(seed=3, num_years=8)
+    funds = [f"T{i}" for i in range(20)]
+    results = IntelliStop({"data_provider": provider}).run_analysis_for_tickers(
+        funds, workers=1, use_threads=True)
+
+    first_fund, _, has_error = next(results)
+    results.close()
+
+    assert not has_error
+    analyzed = set(provider.tickers).intersection(funds)
+    assert first_fund in analyzed
+    # The first fund, plus (at most) the one the worker had already started
+    assert len(analyzed) <= 2
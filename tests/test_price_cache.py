@@ -0,0 +1,98 @@
+""" test_price_cache.py """
+import datetime
+
+import numpy as np
+
+from intellistop.libs import download_data
+from intellistop.libs.lib_types import ConfigProperties, PriceCacheEntryType, TickerDataType
+from intellistop.libs.price_cache import (
+    is_cache_stale, load_price_cache, store_price_cache, UPDATE_TIME_FORMAT
+)
+from tests.fake_download import FakeDownload, make_random_history
+
+
+TODAY = np.datetime64(datetime.date.today(), 'D')
+
+
+def _get_config(cache_dir) -> ConfigProperties:
+    return ConfigProperties({"period": "max", "use_cache": True, "cache_dir": str(cache_dir)})
+
+
+def _seed_cache(cache_dir, ticker: str, history, update_date: str, scale: float = 1.0):
+    """ store the history (prices scaled by scale) as the ticker's cached history """
+    data = TickerDataType(
+        {column: history[column].to_numpy() * (scale if column != "Volume" else 1.0)
+         for column in history.columns},
+        history.index.to_numpy(dtype='datetime64[D]')
+    )
+    store_price_cache(ticker, "1d", PriceCacheEntryType(data, update_date=update_date), cache_dir)
+
+
+def test_stale_cache_downloads_and_merges_new_bars(tmp_path):
+    """ a stale cache only downloads from its last completed bar, and is merged and stored """
+    history = make_random_history(TODAY - 1, 300)
+    _seed_cache(tmp_path, "AAA", history.iloc[:-5], "2000-01-01T00:00:00")
+    fetch = FakeDownload({"AAA": history})
+
+    data = download_data("AAA", _get_config(tmp_path), fetch_function=fetch)
+
+    assert len(fetch.calls) == 1
+    assert fetch.calls[0]["start"] == str(history.index[-7].date())
+    assert "period" not in fetch.calls[0]
+    np.testing.assert_array_equal(data["AAA"]["Close"], history["Close"].to_numpy())
+    np.testing.assert_array_equal(data["AAA"].dates, history.index.to_numpy(dtype='datetime64[D]'))
+
+    entry = load_price_cache("AAA", "1d", str(tmp_path))
+    np.testing.assert_array_equal(entry.data["Close"], history["Close"].to_numpy())
+    assert not is_cache_stale(entry)
+
+
+def test_readjusted_history_is_downloaded_again(tmp_path):
+    """ cached bars that don't match the new download (e.g. after a split) get a full refetch """
+    history = make_random_history(TODAY - 1, 300, seed=1)
+    _seed_cache(tmp_path, "AAA", history.iloc[:-5], "2000-01-01T00:00:00", scale=2.0)
+    fetch = FakeDownload({"AAA": history})
+
+    data = download_data("AAA", _get_config(tmp_path), fetch_function=fetch)
+
+    assert [call["start"] for call in fetch.calls] == [str(history.index[-7].date()), None]
+    assert fetch.calls[1]["period"] == "max"
+    np.testing.assert_array_equal(data["AAA"]["Close"], history["Close"].to_numpy())
+    entry = load_price_cache("AAA", "1d", str(tmp_path))
+    np.testing.assert_array_equal(entry.data["Close"], history["Close"].to_numpy())
+
+
+def test_recent_cache_is_used_unless_its_last_bar_is_today(tmp_path):
+    """ a cache refreshed within the TTL isn't downloaded again, unless its last bar may still be
+    forming (today's) """
+    now = datetime.datetime.now().strftime(UPDATE_TIME_FORMAT)
+    completed = make_random_history(TODAY - 1, 100, seed=2)
+    forming = make_random_history(TODAY, 100, seed=3)
+    _seed_cache(tmp_path, "AAA", completed, now)
+    _seed_cache(tmp_path, "BBB", forming, now)
+    fetch = FakeDownload({"AAA": completed, "BBB": forming})
+
+    data = download_data("AAA", _get_config(tmp_path), fetch_function=fetch)
+    assert not fetch.calls
+    np.testing.assert_array_equal(data["AAA"]["Close"], completed["Close"].to_numpy())
+
+    download_data("BBB", _get_config(tmp_path), fetch_function=fetch)
+    assert [call["tickers"] for call in fetch.calls] == ["BBB"]
+    assert fetch.calls[0]["start"] == str(forming.index[-2].date())
+
+
+def test_is_cache_stale():
+    """ stale after the TTL or when the last bar is today's; older date-only stamps are midnight """
+    now = datetime.datetime(2024, 3, 5, 16, 30)
+
+    def get_entry(update_date: str, last_date: str = "2024-03-04") -> PriceCacheEntryType:
+        dates = np.array(["2024-03-01", last_date], dtype='datetime64[D]')
+        return PriceCacheEntryType(
+            TickerDataType({"Close": np.ones(2)}, dates), update_date=update_date)
+
+    assert not is_cache_stale(get_entry("2024-03-05T16:00:00"), now)
+    assert is_cache_stale(get_entry("2024-03-05T15:30:00"), now)
+    assert is_cache_stale(get_entry("2024-03-05"), now)
+    assert not is_cache_stale(get_entry("2024-03-05"), datetime.datetime(2024, 3, 5, 0, 30))
+    assert is_cache_stale(get_entry("not a date"), now)
+    assert is_cache_stale(get_entry("2024-03-05T16:29:00", last_date="2024-03-05"), now)
@@ -0,0 +1,59 @@
+""" test_variances.py """
+import numpy as np
+import pytest
+
+from intellistop.libs import rolling_variances, calculate_time_series_variances
+
+
+def _sliced_variances(data_set: np.ndarray, window: int) -> np.ndarray:
+    """ Reference: the original sliced implementation (np.var of every window) """
+    ts_var = np.zeros(len(data_set))
+    ts_var[0:window] = np.var(data_set[0:window])
+    for i in range(window, len(data_set)):
+        ts_var[i] = np.var(data_set[i-window+1:i])
+    return ts_var
+
+
+def _trending_prices(num_points: int, level: float, scale: float, trend: float) -> np.ndarray:
+    rng = np.random.default_rng(7)
+    return level + scale * np.cumsum(rng.normal(size=num_points)) + trend * np.arange(num_points)
+
+
+@pytest.mark.parametrize("window", [3, 4, 5, 7, 50, 200])
+@pytest.mark.parametrize("level, scale, trend", [
+    (100.0, 1.0, 0.0),
+    (100.0, 0.01, 0.05),
+    (5000.0, 0.01, 1.0),
+    (100.0, 0.01, 0.5)
+])
+def test_rolling_variances_match_sliced(window, level, scale, trend):
+    """ trending prices, far from their global mean, against the sliced np.var reference """
+    data_set = _trending_prices(3000, level, scale, trend)
+    expected = _sliced_variances(data_set, window)
+    result = rolling_variances(data_set, [window])[0]
+    np.testing.assert_allclose(result, expected, rtol=1e-9, atol=0.0)
+
+
+def test_rolling_variances_windows_share_data():
+    """ several windows at once match each window on its own """
+    data_set = _trending_prices(1000, 100.0, 0.1, 0.2)
+    result = rolling_variances(data_set, [3, 50, 1000, 2000])
+    for ts_var, window in zip(result, [3, 50, 1000, 2000]):
+        np.testing.assert_allclose(ts_var, _sliced_variances(data_set, window), rtol=1e-9)
+
+
+def test_rolling_variances_short_windows():
+    """ windows of 1 and 2 points per slice (undefined and zero variance) """
+    data_set = _trending_prices(20, 100.0, 1.0, 0.0)
+    result = rolling_variances(data_set, [1, 2])
+    assert np.all(np.isnan(result[0][1:]))
+    assert np.all(result[1][2:] == 0.0)
+
+
+def test_calculate_time_series_variances_std():
+    """ std mode is the square root of the rolling variance """
+    data_set = _trending_prices(500, 100.0, 0.5, 0.1)
+    ts_std, window = calculate_time_series_variances(
+        data_set, {'window': 5, 'use_derived': True, 'mode': 'std'})
+    assert window == 5
+    np.testing.assert_allclose(ts_std, np.sqrt(_sliced_variances(data_set, 5)), rtol=1e-9)
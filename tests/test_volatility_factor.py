@@ -0,0 +1,72 @@
+""" test_volatility_factor.py """
+import numpy as np
+import pytest
+
+from intellistop.libs import (
+    generate_stop_loss_data_set, intelligent_moving_average_array, simple_moving_average_array
+)
+from tests.stop_loss_reference import reference_stop_loss_data_set
+
+
+def _get_inputs(rng: np.random.Generator, num_points: int, volatility: float):
+    """ random-walk prices with their IMA and slopes (zeroed over the warm-up, as in the app) """
+    data = 50.0 * np.exp(np.cumsum(rng.normal(0.0003, volatility, num_points)))
+    window = int(rng.integers(20, 220))
+    ima = intelligent_moving_average_array(data, window)
+    slope = np.diff(ima, prepend=ima[0])
+    short_slope = simple_moving_average_array(slope, 15)
+    long_slope = simple_moving_average_array(slope, 50)
+    short_slope[0:window + 15] = 0.0
+    long_slope[0:window + 50] = 0.0
+    return data, ima, short_slope, long_slope
+
+
+@pytest.mark.parametrize("seed", range(12))
+def test_stop_loss_engine_matches_per_bar_reference(seed):
+    """ segments (indexes, lines, max prices) and event logs match the per-bar loop """
+    rng = np.random.default_rng(seed)
+    for _ in range(10):
+        data, ima, short_slope, long_slope = _get_inputs(
+            rng, int(rng.integers(2, 3000)), float(rng.choice([0.005, 0.02, 0.05])))
+        volatility_factor = float(rng.uniform(2.0, 30.0))
+        min_vf = volatility_factor * float(rng.uniform(0.5, 1.0))
+
+        stop_losses, event_log = generate_stop_loss_data_set(
+            data, volatility_factor, ima, short_slope, long_slope, min_vf)
+        ref_segments, ref_event_log = reference_stop_loss_data_set(
+            data.tolist(), volatility_factor, ima.tolist(), short_slope.tolist(),
+            long_slope.tolist(), min_vf)
+
+        assert len(stop_losses) == len(ref_segments)
+        for stop_loss, segment in zip(stop_losses, ref_segments):
+            assert list(stop_loss.time_index_list) == segment["time_index_list"]
+            assert stop_loss.max_price == segment["max_price"]
+            assert stop_loss.max_price_index == segment["max_price_index"]
+            np.testing.assert_array_equal(stop_loss.stop_loss_line, segment["stop_loss_line"])
+            np.testing.assert_array_equal(stop_loss.caution_line, segment["caution_line"])
+            np.testing.assert_array_equal(
+                stop_loss.conservative_line, segment["conservative_line"])
+
+        assert [(log.index, log.event.value, log.price) for log in event_log] == ref_event_log
+
+
+def test_stop_loss_engine_reenters_on_stop_bar():
+    """ a re-entry on the stop bar itself keeps the stopped segment's lines intact """
+    # Stopped out on 3 (then re-entered on 4, off the 85 minimum) and again on 8, which is
+    # already a 1 VF rebound off that minimum
+    data = np.array([100.0, 120.0, 90.0, 85.0, 95.0, 130.0, 150.0, 120.0, 110.0, 160.0])
+    ima = np.full(len(data), 50.0)
+    short_slope = np.ones(len(data))
+    long_slope = np.zeros(len(data))
+
+    stop_losses, event_log = generate_stop_loss_data_set(
+        data, 10.0, ima, short_slope, long_slope, 10.0)
+    ref_segments, ref_event_log = reference_stop_loss_data_set(
+        data.tolist(), 10.0, ima.tolist(), short_slope.tolist(), long_slope.tolist(), 10.0)
+
+    assert [(log.index, log.event.value, log.price) for log in event_log] == ref_event_log
+    assert [(log.index, log.event.value) for log in event_log][-2:] == \
+        [(8, 'stop'), (8, 'activate')]
+    assert len(stop_losses) == len(ref_segments) == 3
+    for stop_loss, segment in zip(stop_losses, ref_segments):
+        np.testing.assert_array_equal(stop_loss.stop_loss_line, segment["stop_loss_line"])